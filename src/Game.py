@@ -3,6 +3,7 @@
 
 from enum import Enum
 import os.path
+import random
 
 
 # ---------------------- Block Classes ---------------------------------------
@@ -201,14 +202,33 @@ class Stack:
     class Node:
         '''Simple Singly Linked List node for Stack
 
+        Besides the block, every node caches a summary of the valid stack that
+        starts at it (going down). It only depends on the nodes below, which
+        never change once linked, so it is computed a single time on push.
+
         Attributes:
            next(Stack.Node): Pointer to next node, or None
            value(Block): Instance of the block class
+           valid(int): Height of the longest valid stack starting at this node
+           total(int): Sum of the numbers (offset by 1) in that valid stack
+           missing_height(int): Amount of numbers missing from that valid stack
+           missing_total(int): Sum of the missing numbers (offset by 1)
+           run(int): Height of the consecutive stack starting at this node
+           base(Block): Bottom block of that consecutive stack
+           peak(int): Highest ::meth::Game.Stack.score() of the stack when this
+            node or any node below it is on top
         '''
-        __slots__ = ['next', 'value']
+        __slots__ = ['next', 'value', 'valid', 'total', 'missing_height', 'missing_total', 'run', 'base', 'peak']
         def __init__(self):
             self.next = None
             self.value = None
+            self.run = 0
+            self.base = None
+            self.peak = 0
+            self.valid = 0
+            self.total = 0
+            self.missing_height = 0
+            self.missing_total = 0
 
 
     def __init__(self):
@@ -247,7 +267,49 @@ class Stack:
             newNode = self.Node()
             newNode.value = element
 
-            newNode.next = self.head.next
+            below = self.head.next
+            if below is not None and element < below.value:
+                prev = element.number
+                curr = below.value.number
+
+                newNode.valid = below.valid + 1
+                newNode.total = below.total + prev + 1
+                newNode.missing_height = below.missing_height + curr - prev - 1
+
+                '''
+                If prev = 2 and curr = 6, then end = curr - 1, start = prev + 1
+
+                But because of the +1 offset ...
+                    end = curr, start = prev + 2
+
+                sum = end * (end + 1) / 2 - (start - 1) * start / 2
+
+                    => 1/2 * (curr*curr + curr - prev*prev - 3*prev - 2)
+
+                Which is 0 when there is no gap (curr = prev + 1)
+                '''
+                newNode.missing_total = below.missing_total + (curr*curr + curr - prev*prev - prev*3 - 2) // 2
+
+            else:
+                newNode.valid = 1
+                newNode.total = element.number + 1
+
+            if below is not None and element.color == below.value.color and element.number + 1 == below.value.number:
+                newNode.run = below.run + 1
+                newNode.base = below.base
+
+            else:
+                newNode.run = 1
+                newNode.base = element
+
+            if below is None:
+                newNode.peak = newNode.total
+            elif newNode.valid < 2:
+                newNode.peak = below.peak
+            else:
+                newNode.peak = max(below.peak, newNode.valid * newNode.total - newNode.missing_height * newNode.missing_total)
+
+            newNode.next = below
             self.head.next = newNode
 
             self.height += 1
@@ -351,6 +413,70 @@ class Stack:
 
             return result
 
+    def transfer(self, other, n: int):
+        '''Moves the top "n" elements of this stack on top of another stack, keeping their order
+
+        Only the node pointers are followed, so no intermediate stacks are
+        created (unlike :meth:`Stack.pop` with an integer)
+
+        Args:
+            other(Stack): Stack that will receive the elements
+            n(int): Amount of elements to move
+
+        Returns:
+            list[Block]: Moved blocks, from the top
+
+        Raises:
+            ValueError: When moving more than the available height
+        '''
+        if n > self.height:
+            raise ValueError(f"Desired {int(n)} exceeds height {self.height}")
+
+        blocks = list()
+        node = self.head.next
+
+        for i in range(int(n)):
+            blocks.append(node.value)
+            node = node.next
+
+        self.head.next = node
+        self.height -= int(n)
+
+        # Blocks were collected from the top, so push them back from the bottom
+        for block in reversed(blocks):
+            other.push(block)
+
+        return blocks
+
+    def score(self) -> int:
+        '''Term of this stack in ::meth::Game.Game.static_evaluation()
+
+        Uses the longest valid stack on top (or nothing, if only the top block
+        is valid on a taller stack). The values are cached in the top node, so
+        this takes constant time.
+
+        Returns:
+           int: height * sum - missing height * missing sum
+        '''
+        top = self.head.next
+
+        if top is None or (top.valid < 2 and self.height > 1):
+            return 0
+
+        return top.valid * top.total - top.missing_height * top.missing_total
+
+    def peakScore(self) -> int:
+        '''Highest score this stack can reach by only removing blocks from its top
+
+        Returns:
+           int: Highest ::meth::Game.Stack.score() of this stack or any stack
+           left after popping from it (0 if empty)
+        '''
+        if self.isEmpty():
+            return 0
+
+        return self.head.next.peak
+
     def isEmpty(self) -> bool:
         return self.height == 0
 
@@ -359,17 +485,19 @@ class Stack:
             self.pop()
 
     def copy(self):
-        tempStack = Stack()
-        copy = Stack()
+        '''Stack with the same blocks, sharing all of its nodes with this one
 
-        # Transfer all contents of self to a tempStack
-        while not self.isEmpty():
-            tempStack.push(self.pop())
+        Nodes never change once linked: push links a new node on top, and pop
+        and transfer only move the head pointer. So both stacks can keep
+        changing independently, each from its own head, and copying takes
+        constant time no matter the height
 
-        # Transfer all contents back to self, but also to copy
-        while not tempStack.isEmpty():
-            self.push(tempStack.top())
-            copy.push(tempStack.pop())
+        Returns:
+           Stack: Copy of this stack
+        '''
+        copy = Stack()
+        copy.head.next = self.head.next
+        copy.height = self.height
 
         return copy
 
@@ -379,13 +507,7 @@ class Stack:
         Returns:
            bool: True if the following blocks are the same color and wider than the previous ones
         '''
-        copy = self.copy()
-
-        count = 1
-        while copy.height > 1 and copy.pop() < copy.top():
-            count += 1
-
-        return self.height == count
+        return self.height > 0 and self.head.next.valid == self.height
 
     def isConsecutive(self) -> bool:
         '''Checks if the stack of blocks is consecutive
@@ -394,14 +516,45 @@ class Stack:
            bool: True if the following blocks are the same color and follows the
            correct sequence after the previous one (1, 2, 3, etc.)
         '''
-        copy = self.copy()
+        return self.height > 0 and self.head.next.run == self.height
+
+    def runHeight(self) -> int:
+        '''Height of the consecutive stack on top, which is the only one that can be moved
+
+        Returns:
+           int: Amount of blocks in the top consecutive stack (0 if empty)
+        '''
+        if self.isEmpty():
+            return 0
+
+        return self.head.next.run
+
+    def runBottom(self):
+        '''Bottom block of the consecutive stack on top
+
+        Returns:
+           Block: Block that will be placed on the destination, or None if empty
+        '''
+        if self.isEmpty():
+            return None
+
+        return self.head.next.base
+
 
-        count = 1
-        while copy.height > 1 and copy.pop() - copy.top() == -1:
-            count += 1
+    def __iter__(self):
+        '''Walks the blocks from the top of the stack to the bottom
 
-        return self.height == count
+        Unlike the copy-based helpers, it only follows the node pointers, so
+        the stack is never modified while iterating
 
+        Returns:
+           Block: Next block, starting from the top of the stack
+        '''
+        node = self.head.next
+
+        while node is not None:
+            yield node.value
+            node = node.next
 
     def __str__(self) -> str:
         copy = self.copy()
@@ -417,17 +570,44 @@ class Stack:
         return str(self)
 
     def __hash__(self) -> int:
-        copy = self.copy()
-
         total = 0
 
-        while not copy.isEmpty():
-            total += hash(copy.pop())
+        for block in self:
+            total += hash(block)
             total *= 100
+            # Keep the hash within 64 bits
+            total &= zobrist_mask
 
         return total
 
 
+# ---------------------- Zobrist Keys ----------------------------------------
+
+zobrist_mask = (1 << 64) - 1
+
+# Seeded, so keys are the same in every process and every run
+zobrist_random = random.Random(0x5158)
+
+# zobrist_keys[column][position][hash(block)], position counted from the bottom
+zobrist_keys = list()
+
+
+def zobrist_extend(columns: int, height: int):
+    '''Makes sure there are Zobrist keys for the given board dimensions
+
+    Args:
+       columns(int): Amount of stacks in the game
+       height(int): Maximum amount of blocks a stack can hold
+    '''
+    while len(zobrist_keys) < columns:
+        zobrist_keys.append(list())
+
+    for rows in zobrist_keys:
+        while len(rows) < height:
+            # One key for every possible hash(block) (color * 10 + number)
+            rows.append([zobrist_random.getrandbits(64) for _ in range(len(BlockColors) * 10 + 10)])
+
+
 # ---------------------- Game Class ------------------------------------------
 
 
@@ -439,8 +619,11 @@ class Game:
 
     Attributes:
        stacks: list of Stacks of Blocks with the current game arrangement
+       key(int): 64 bit Zobrist hash of the arrangement, updated on every move
+       owned(int): Bit mask of the stacks that only this game uses. The others
+        are shared with copies, and are copied before a move changes them
     '''
-    __slots__ = ['stacks']
+    __slots__ = ['stacks', 'key', 'owned']
 
     def __init__(self, param = None):
 
@@ -457,6 +640,30 @@ class Game:
         else:
             raise TypeError("Expected list of stacks or string with filename")
 
+        self.owned = (1 << len(self.stacks)) - 1
+        self.rehash()
+
+
+    def rehash(self) -> int:
+        '''Computes the Zobrist key from scratch
+
+        Moves keep the key up to date, so this is only needed after editing the
+        stacks directly
+
+        Returns:
+           int: New value of the key attribute
+        '''
+        zobrist_extend(len(self.stacks), sum(stack.height for stack in self.stacks))
+
+        self.key = 0
+        for column, stack in enumerate(self.stacks):
+            rows = zobrist_keys[column]
+
+            for position, block in enumerate(reversed(list(stack))):
+                self.key ^= rows[position][hash(block)]
+
+        return self.key
+
 
     def parse_from_file(self, file_name: str):
         '''Helper function to help fill the stacks attribute with the contents of a file
@@ -520,21 +727,13 @@ class Game:
             raise ValueError(f"Expected src_height to be greater than 0")
 
 
-        # If the specified source is not consecutive (even if it were valid)
-        # We canot split a stack that is not consecutive
-        if not self.stacks[src].top(src_height).isConsecutive():
-            return False
+        source = self.stacks[src].head.next
 
-        # Cannot split up a stack that is consecutive "mid-way"
-        if self.stacks[src].height > src_height and self.stacks[src].top(src_height + 1).isConsecutive():
+        # Only the whole consecutive stack on top can move: a stack that is not
+        # consecutive cannot be split, and neither can a consecutive one "mid-way"
+        if src_height != source.run:
             return False
 
-        copy = self.stacks[src].top(src_height)
-        while copy.height > 1:
-            copy.pop()
-        bottom_src_block = copy.top()
-
-
         # Empty slots are more than capable of holding any valid stack. However,
         # I'm making a custom rule to prevent some moves
         if self.stacks[dest].height == 0:
@@ -546,7 +745,7 @@ class Game:
             return True
 
         # Otherwise, compare the bottom of the src stack with the destination stack
-        elif bottom_src_block < self.stacks[dest].top():
+        elif source.base < self.stacks[dest].top():
             return True
 
         return False
@@ -564,12 +763,80 @@ class Game:
            bool: True if operation was successful
         '''
 
-        if not self.is_valid_move(int(src), int(dest), int(src_height)):
-            return False
+        return self.make_move(src, dest, src_height) is not None
 
-        self.stacks[dest].push(self.stacks[src].pop(src_height))
 
-        return True
+    def make_move(self, src: int, dest: int, src_height: int):
+        '''Perform a move action in place and return a token to undo it
+
+        Searching with make_move/unmake_move avoids copying the whole game for
+        every candidate move
+
+        Args:
+           src(int): Index of source stack in stacks array
+           dest(int): Index of destination stack in stacks array
+           src_height(int): Height of the source array to be moved
+
+        Returns:
+           (src, dest, height) or None: Undo token for ::meth::Game.Game.unmake_move(),
+           or None if the move is not valid (the game is left untouched)
+        '''
+        src, dest, src_height = int(src), int(dest), int(src_height)
+
+        if not self.is_valid_move(src, dest, src_height):
+            return None
+
+        self.transfer(src, dest, src_height)
+
+        return (src, dest, src_height)
+
+
+    def unmake_move(self, token):
+        '''Restore the exact state the game had before ::meth::Game.Game.make_move()
+
+        Tokens must be undone in the reverse order they were made
+
+        Args:
+           token((src, dest, height)): Value returned by make_move
+        '''
+        src, dest, src_height = token
+
+        # Moving the blocks back does not need to be validated
+        self.transfer(dest, src, src_height)
+
+
+    def transfer(self, src: int, dest: int, src_height: int):
+        '''Moves blocks between stacks without validating, updating the Zobrist key
+
+        Args:
+           src(int): Index of source stack in stacks array
+           dest(int): Index of destination stack in stacks array
+           src_height(int): Amount of blocks to move
+        '''
+        owned = self.owned
+
+        # Stacks shared with copies are copied before they change
+        if not owned >> src & 1:
+            self.stacks[src] = self.stacks[src].copy()
+        if not owned >> dest & 1:
+            self.stacks[dest] = self.stacks[dest].copy()
+        self.owned = owned | 1 << src | 1 << dest
+
+        moved = self.stacks[src].transfer(self.stacks[dest], src_height)
+
+        src_rows = zobrist_keys[src]
+        dest_rows = zobrist_keys[dest]
+
+        # Positions (from the bottom) of the lowest moved block before and after
+        src_position = self.stacks[src].height
+        dest_position = self.stacks[dest].height - src_height
+
+        key = self.key
+        for offset, block in enumerate(reversed(moved)):
+            code = hash(block)
+            key ^= src_rows[src_position + offset][code] ^ dest_rows[dest_position + offset][code]
+
+        self.key = key
 
 
     def possible_moves(self):
@@ -580,30 +847,86 @@ class Game:
            to be used with the ::meth::Game.Game.move() method
         '''
 
-        for src in range(len(self.stacks)):
+        stacks = self.stacks
+
+        for src, source in enumerate(stacks):
 
             # Do not consider removing elements from empty stacks
-            if self.stacks[src].height == 0:
+            if source.height == 0:
                 continue
 
-            for dest in range(len(self.stacks)):
+            # Only the consecutive stack on top can move (see is_valid_move), so
+            # there is a single height to consider for every source
+            top = source.head.next
+            height = top.run
+            bottom = top.base
+            whole_stack = height == source.height
+
+            for dest, destination in enumerate(stacks):
                 # Do not consider staying the same place
                 if src == dest:
                     continue
 
-                if self.stacks[src].height > 1:
-                    # Check all potential heights
-                    for height in range(1, self.stacks[src].height + 1):
-                        if self.is_valid_move(src, dest, height):
-                            yield (src, dest, height)
-
-                        # !! End height loop early whenever possible
-                        elif not self.stacks[src].top(height).isConsecutive():
-                            continue
+                if destination.height == 0:
+                    if not whole_stack:
+                        yield (src, dest, height)
 
                 else:
-                    if self.is_valid_move(src, dest, 1):
-                        yield (src, dest, 1)
+                    target = destination.head.next.value
+
+                    if bottom.color == target.color and bottom.number < target.number:
+                        yield (src, dest, height)
+
+
+    def evaluate_move(self, src: int, dest: int, src_height: int) -> int:
+        '''Static evaluation the game would have after a move, without making it
+
+        Only the terms of the source and destination stacks change, and both
+        can be computed from the cached node values
+
+        Args:
+           src(int): Index of source stack in stacks array
+           dest(int): Index of destination stack in stacks array
+           src_height(int): Height of the source array to be moved (must be
+            the whole consecutive stack on top, see is_valid_move)
+
+        Returns:
+           int: ::meth::Game.Game.static_evaluation() after the move
+        '''
+        source = self.stacks[src]
+        destination = self.stacks[dest]
+
+        top = source.head.next
+        below = top
+        for i in range(src_height):
+            below = below.next
+
+        # Source term once the moved blocks are gone
+        src_score = 0
+        if below is not None and not (below.valid < 2 and source.height - src_height > 1):
+            src_score = below.valid * below.total - below.missing_height * below.missing_total
+
+        # The moved blocks are consecutive, so their numbers (offset by 1) go
+        # from top + 1 to top + src_height
+        first = top.value.number + 1
+        moved_total = src_height * first + src_height * (src_height - 1) // 2
+
+        target = destination.head.next
+        if target is None:
+            dest_score = src_height * moved_total
+
+        else:
+            # Same gap formula used in Stack.push, between the bottom moved block
+            # and the current top of the destination
+            prev = top.base.number
+            curr = target.value.number
+
+            missing_height = target.missing_height + curr - prev - 1
+            missing_total = target.missing_total + (curr*curr + curr - prev*prev - prev*3 - 2) // 2
+
+            dest_score = (src_height + target.valid) * (moved_total + target.total) - missing_height * missing_total
+
+        return self.static_evaluation() - source.score() - destination.score() + src_score + dest_score
 
 
     def won(self) -> bool:
@@ -612,10 +935,8 @@ class Game:
         Returns:
            bool: True if game fulfills winning condition
         '''
-        stacks = [s.copy() for s in self.stacks]
-
         # Elements must be in ascending order with the correct color
-        for stack in stacks:
+        for stack in self.stacks:
             if stack.height == 0:
                 continue
             elif not(stack.height == 7 and stack.isConsecutive()):
@@ -643,72 +964,16 @@ class Game:
             proceed with calculations. The subtraction will help penalize
             valid, but not consecutive stacks
 
+           See ::meth::Game.Stack.score() for the term of a single stack
+
         Returns:
            int: Static evaluation of current game state
         '''
         total = 0
 
+        # Every stack keeps its own term cached in its nodes
         for stack in self.stacks:
-            # Empty stacks MUST be ignored
-            if stack is None or stack.height == 0:
-                continue
-
-
-            # There will not be any missing elements if the full stack is consecutive
-            if stack.isConsecutive():
-                top = stack.top() + 1
-                bottom = top + stack.height - 1
-
-                # Adding all the elements of the *consecutive* stack offsetting all elements by 1
-                stack_sum = (bottom*bottom + int(bottom) - top*top + int(top)) / 2
-
-                total += stack.height * stack_sum
-
-                continue
-
-
-            for height in range(stack.height, 1, -1):
-                if stack.top(height).isValid():
-                    missing_sum = 0
-                    missing_height = 0
-
-                    stack_sum = 0
-                    stack_height = height
-
-                    copy = stack.top(height)
-                    while copy.height > 1:
-                        prev = copy.pop()
-                        curr = copy.top()
-
-                        stack_sum += prev + 1
-
-                        if curr - prev > 1:
-                            '''
-                            If prev = 2 and curr = 6, then end = curr - 1, start = prev + 1
-
-                            But because of the +1 offset ...
-                                end = curr, start = prev + 2
-
-                            height = end - (start + 1) = end - start - 1
-
-                            AND
-
-                            sum = end * (end + 1) / 2 - (start - 1) * start / 2
-
-                                => curr * (cur + 1) / 2 - (prev + 1) * (prev + 2) / 2
-
-                                => 1/2 * (curr*curr + curr - prev*prev - 3*prev - 2)
-                            '''
-
-                            missing_height += curr - prev - 1
-                            missing_sum += (curr*curr + int(curr) - prev*prev - prev*3 - 2) / 2
-
-                    stack_sum += copy.pop() + 1
-
-                    total += stack_height * stack_sum - missing_height * missing_sum
-
-                    break
-
+            total += stack.score()
 
         return int(total)
 
@@ -716,13 +981,28 @@ class Game:
     def copy(self):
         '''Make game copy and return it
 
-        Basically just clones stack attribute
+        Both games share every stack (copy on write): a move only copies the
+        two stacks it changes, in constant time since stacks share their
+        nodes too (see ::meth::Game.Stack.copy()). So a child made by moving
+        on a copy costs the moved blocks, and keeps the other stacks of its
+        parent. The Zobrist key is copied instead of computed again
+
+        Stacks must only be changed through moves (or ::meth::Game.Game.transfer())
+        once a game was copied
 
         Returns:
            Game: Copy of current game
 
         '''
-        return Game([s.copy() for s in self.stacks])
+        copy = Game.__new__(Game)
+        copy.stacks = list(self.stacks)
+        copy.key = self.key
+
+        # Neither game can change the shared stacks in place anymore
+        copy.owned = 0
+        self.owned = 0
+
+        return copy
 
 
     def print_stacks(self):
@@ -750,15 +1030,7 @@ class Game:
 
 
     def __hash__(self):
-        total = 2166136261
-
-        for stack in self.stacks:
-            total *= 16777619
-            total ^= hash(stack)
-            # A little extra just to prevent numbers from getting tooo big
-            total % int(1E19)
-
-        return total
+        return self.key
 
 
 def main():
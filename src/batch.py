@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Solves many puzzle files at once and streams the results as JSON lines
+
+Every puzzle is solved by ::func::main.solve() in its own worker process,
+without printing the game on each step. One JSON object is written per puzzle
+as soon as it finishes, so results can be consumed while the batch is running.
+
+Example:
+   python batch.py ../input/*.txt --workers 8 --output results.jsonl
+'''
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import json
+import os.path
+import sys
+import time
+
+import Game
+import cache as solution_cache
+import main
+import shorten
+import stats as search_stats
+import transposition
+
+
+root_dir = os.path.normpath(os.path.join(os.path.abspath(os.path.dirname(__file__)), '..'))
+default_pattern = os.path.join(root_dir, 'input', '*.txt')
+
+# Solution cache of the current worker process, see worker_cache
+worker_caches = dict()
+
+
+def worker_cache(cache_path: str, warm: bool = False) -> solution_cache.SolutionCache:
+    '''Solution cache kept open by the current process between puzzles
+
+    Args:
+       cache_path(str): Database file
+       warm(bool): Load its solutions into memory when it is first opened
+
+    Returns:
+       cache.SolutionCache: Open cache
+    '''
+    if cache_path not in worker_caches:
+        worker_caches[cache_path] = solution_cache.SolutionCache(cache_path)
+
+        if warm:
+            worker_caches[cache_path].warm()
+
+    return worker_caches[cache_path]
+
+
+def solve_file(file_name: str, depth: int, collect_stats: bool = False, seconds: float = None,
+        cache_path: str = None, shorten_seconds: float = None, warm: bool = False) -> dict:
+    '''Solves a single puzzle file
+
+    Args:
+       file_name(str): Puzzle in the ::meth::Game.Game.parse_from_file() format
+       depth(int): Depth passed to minimax after every move
+       collect_stats(bool): Add the search counters to the result
+       seconds(float): Time budget of every step, see ::func::main.solve()
+       cache_path(str): Persistent solution cache to use, see ::mod::cache
+       shorten_seconds(float): When set, the solution is post-processed with
+        ::func::shorten.shorten() for up to this long
+       warm(bool): Load the cached solutions into memory the first time the
+        cache is opened by this process
+
+    Returns:
+       dict: JSON-ready result with the moves, step count, final score,
+       whether the game was won and the wall time in seconds. Shortened
+       results count the steps of the shortened moves, and keep the count of
+       the solver as unshortened_steps
+    '''
+    start = time.perf_counter()
+
+    game = Game.Game(file_name)
+    table = transposition.TranspositionTable(main.table_bytes, main.symmetric_table)
+    stats = search_stats.SearchStats() if collect_stats else None
+    cache = worker_cache(cache_path, warm) if cache_path is not None else None
+
+    try:
+        moves, final_game, steps = main.solve(game, depth, table, stats=stats, seconds=seconds, cache=cache)
+    finally:
+        if cache is not None:
+            cache.flush()
+
+    unshortened_steps = steps
+    if shorten_seconds is not None:
+        moves = shorten.shorten(game, moves, seconds=shorten_seconds)
+        steps = len(moves)
+
+    result = {
+            'file': file_name,
+            'moves': [list(possible_move) for possible_move in moves],
+            'steps': steps,
+            'score': final_game.static_evaluation(),
+            'won': final_game.won(),
+            'seconds': round(time.perf_counter() - start, 6),
+            }
+
+    if shorten_seconds is not None:
+        result['unshortened_steps'] = unshortened_steps
+
+    if stats is not None:
+        result['stats'] = stats.as_dict()
+
+    return result
+
+
+def find_puzzles(patterns) -> list:
+    '''Expands files, directories and glob patterns into puzzle files
+
+    Args:
+       patterns(list[str]): Files, directories (all their .txt files) or globs
+
+    Returns:
+       list[str]: Sorted puzzle files, without duplicates
+    '''
+    found = set()
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.txt')
+
+        found.update(name for name in glob.glob(pattern) if os.path.isfile(name))
+
+    return sorted(found)
+
+
+def run(file_names, depth: int, workers: int, output, collect_stats: bool = False, seconds: float = None,
+        cache_path: str = None, shorten_seconds: float = None, warm: bool = False):
+    '''Solves the puzzles over a process pool, writing a line as each one finishes
+
+    Args:
+       file_names(list[str]): Puzzle files to solve
+       depth(int): Depth passed to minimax after every move
+       workers(int): Amount of worker processes
+       output(file): Where the JSON lines are written
+       collect_stats(bool): Add the search counters to every line
+       seconds(float): Time budget of every step, see ::func::main.solve()
+       cache_path(str): Persistent solution cache shared by the workers
+       shorten_seconds(float): Time budget to shorten every solution
+       warm(bool): Load the cached solutions into memory in every worker
+
+    Returns:
+       int: Amount of puzzles that failed to solve
+    '''
+    failures = 0
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {executor.submit(solve_file, file_name, depth, collect_stats, seconds, cache_path, shorten_seconds, warm): file_name for file_name in file_names}
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+
+            except Exception as e:
+                failures += 1
+                result = {'file': futures[future], 'error': f"{type(e).__name__}: {e}"}
+
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+
+    return failures
+
+
+def cli(argv=None) -> int:
+    '''Command line entry point
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+
+    Returns:
+       int: Exit status (1 if any puzzle failed)
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('puzzles', nargs='*', default=[default_pattern],
+            help='puzzle files, directories or glob patterns (default: input/*.txt)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+            help='amount of worker processes (default: one per CPU)')
+    parser.add_argument('-d', '--depth', type=int, default=main.max_depth,
+            help=f'minimax depth after every move (default: {main.max_depth})')
+    parser.add_argument('-o', '--output', default='-',
+            help='file for the JSON lines, "-" for stdout (default)')
+    parser.add_argument('--stats', action='store_true', help='add search counters to every line')
+    parser.add_argument('-t', '--seconds', type=float,
+            help='search each step with iterative deepening for this long instead of a fixed depth')
+    parser.add_argument('--cache', nargs='?', const=solution_cache.default_path,
+            help=f'reuse and store solutions in this SQLite file (default: {solution_cache.default_path})')
+    parser.add_argument('--warm', action='store_true', help='load the cached solutions into memory first')
+    parser.add_argument('--shorten', type=float, metavar='SECONDS',
+            help='remove cycles and detours from every solution, for up to this long')
+    args = parser.parse_args(argv)
+
+    file_names = find_puzzles(args.puzzles)
+    if not file_names:
+        parser.error(f"No puzzle files match {args.puzzles}")
+
+    if args.output == '-':
+        return 1 if run(file_names, args.depth, args.workers, sys.stdout, args.stats, args.seconds, args.cache, args.shorten, args.warm) else 0
+
+    with open(args.output, 'w') as output:
+        return 1 if run(file_names, args.depth, args.workers, output, args.stats, args.seconds, args.cache, args.shorten, args.warm) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
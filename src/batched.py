@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Array-backed batches of boards, scored with vectorized NumPy kernels
+
+Scoring one ::class::Game.Game at a time goes through Python objects for
+every block. Searches that score thousands of boards at once (beam search,
+rollouts, tablebase generation) can pack them into a ::class::BoardBatch and
+get ::meth::Game.Game.static_evaluation(), ::meth::Game.Game.won() and the
+legal moves of ::meth::Game.Game.possible_moves() for all of them in a few
+array operations. Results are identical to the scalar methods.
+
+NumPy is only needed by this module.
+'''
+
+import numpy as np
+
+import Game
+import board
+
+
+class BoardBatch:
+    '''N boards stored as (N, columns, height) arrays, indexed from the bottom
+
+    Stacks can hold more than seven blocks while a puzzle is being solved, so
+    the height axis is as tall as the tallest stack in the batch.
+
+    Attributes:
+       numbers(np.ndarray): (N, columns, height) int8 block numbers
+       colors(np.ndarray): (N, columns, height) int8 color values, 0 for empty slots
+       heights(np.ndarray): (N, columns) int8 amount of blocks in every stack
+    '''
+    __slots__ = ['numbers', 'colors', 'heights', 'summary']
+
+    def __init__(self, numbers: np.ndarray, colors: np.ndarray, heights: np.ndarray):
+        self.numbers = numbers
+        self.colors = colors
+        self.heights = heights
+
+        # Per-slot values of Stack.Node, computed on first use
+        self.summary = None
+
+    @classmethod
+    def from_boards(cls, boards, height: int = None):
+        '''Packs boards encoded with ::func::board.encode()
+
+        Args:
+           boards(list[bytes]): Packed boards, all with the same amount of columns
+           height(int): Height axis size, the tallest stack by default
+
+        Returns:
+           BoardBatch: New batch
+
+        Raises:
+           ValueError: If the boards have different amounts of columns
+        '''
+        all_columns = [board.columns(packed) for packed in boards]
+        width = len(all_columns[0]) if all_columns else 0
+
+        if any(len(board_columns) != width for board_columns in all_columns):
+            raise ValueError("Expected every board to have the same amount of columns")
+
+        if height is None:
+            height = max([len(column) for board_columns in all_columns for column in board_columns] + [1])
+
+        # Padding every column with empty slots gives a single buffer in array order
+        padded = b''.join(column.ljust(height, b'\0') for board_columns in all_columns for column in board_columns)
+        codes = np.frombuffer(padded, dtype=np.int8).reshape(len(all_columns), width, height)
+        heights = np.array([[len(column) for column in board_columns] for board_columns in all_columns],
+                dtype=np.int8).reshape(len(all_columns), width)
+
+        return cls(codes % 10, codes // 10, heights)
+
+    @classmethod
+    def from_games(cls, games, height: int = None):
+        '''Packs games
+
+        Args:
+           games(list[Game.Game]): Games, all with the same amount of stacks
+           height(int): Height axis size, the tallest stack by default
+
+        Returns:
+           BoardBatch: New batch
+        '''
+        return cls.from_boards([board.encode(game) for game in games], height)
+
+    def __len__(self) -> int:
+        return self.heights.shape[0]
+
+    def board(self, index: int) -> bytes:
+        '''Packed board of a single entry, see ::func::board.encode()
+
+        Args:
+           index(int): Entry of the batch
+
+        Returns:
+           bytes: Packed board
+        '''
+        codes = (self.colors[index].astype(np.int16) * 10 + self.numbers[index]).astype(np.uint8)
+
+        return board.join(
+                codes[column, :self.heights[index, column]].tobytes()
+                for column in range(self.heights.shape[1])
+                )
+
+    def game(self, index: int) -> Game.Game:
+        '''Rebuilds a single entry as a game
+
+        Args:
+           index(int): Entry of the batch
+
+        Returns:
+           Game.Game: New game
+        '''
+        return board.decode(self.board(index))
+
+    def summarize(self) -> dict:
+        '''Vectorized version of the values cached in every ::class::Game.Stack.Node
+
+        Walks the height axis from the bottom, computing every slot from the
+        slot under it exactly like ::meth::Game.Stack.push() does
+
+        Returns:
+           dict: (N, columns, height) int16 arrays 'valid', 'total',
+           'missing_height', 'missing_total' and 'run', plus 'base' with the
+           number of the bottom block of every consecutive run
+        '''
+        if self.summary is not None:
+            return self.summary
+
+        # Slots first, so every step of the walk reads contiguous memory
+        numbers = np.moveaxis(self.numbers, 2, 0).astype(np.int16)
+        colors = np.moveaxis(self.colors, 2, 0)
+        names = ('valid', 'total', 'missing_height', 'missing_total', 'run', 'base')
+        layers = {name: list() for name in names}
+
+        for position in range(numbers.shape[0]):
+            prev = numbers[position]
+
+            if position == 0:
+                ones = np.ones_like(prev)
+                zeros = np.zeros_like(prev)
+
+                node = dict(zip(names, (ones, prev + 1, zeros, zeros, ones, prev)))
+
+            else:
+                curr = numbers[position - 1]
+                same_color = colors[position] == colors[position - 1]
+
+                # Valid: smaller block of the same color on top (Block.__lt__)
+                valid = same_color & (prev < curr)
+                consecutive = same_color & (prev + 1 == curr)
+
+                node = {
+                        'valid': np.where(valid, node['valid'] + 1, 1),
+                        'total': np.where(valid, node['total'], 0) + prev + 1,
+                        'missing_height': np.where(valid, node['missing_height'] + curr - prev - 1, 0),
+                        'missing_total': np.where(valid,
+                            node['missing_total'] + (curr*curr + curr - prev*prev - prev*3 - 2) // 2, 0),
+                        'run': np.where(consecutive, node['run'] + 1, 1),
+                        'base': np.where(consecutive, node['base'], prev),
+                        }
+
+            for name in names:
+                layers[name].append(node[name])
+
+        summary = {name: np.stack(layers[name], axis=2) for name in names}
+
+        self.summary = summary
+        return summary
+
+    def top(self, values: np.ndarray) -> np.ndarray:
+        '''Value of the top slot of every stack
+
+        Args:
+           values(np.ndarray): (N, columns, height) array, like the ones in
+            ::meth::BoardBatch.summarize()
+
+        Returns:
+           np.ndarray: (N, columns) values, meaningless for empty stacks
+        '''
+        index = np.maximum(self.heights.astype(np.int64) - 1, 0)[:, :, None]
+
+        return np.take_along_axis(values, index, axis=2)[:, :, 0]
+
+    def stack_scores(self) -> np.ndarray:
+        '''Vectorized ::meth::Game.Stack.score()
+
+        Returns:
+           np.ndarray: (N, columns) score of every stack
+        '''
+        summary = self.summarize()
+        heights = self.heights.astype(np.int64)
+        valid = self.top(summary['valid'])
+
+        scores = valid * self.top(summary['total']) \
+                - self.top(summary['missing_height']) * self.top(summary['missing_total'])
+
+        return np.where((heights == 0) | ((valid < 2) & (heights > 1)), 0, scores)
+
+    def static_evaluation(self) -> np.ndarray:
+        '''Vectorized ::meth::Game.Game.static_evaluation()
+
+        Returns:
+           np.ndarray: (N,) evaluation of every board
+        '''
+        return self.stack_scores().sum(axis=1)
+
+    def won(self) -> np.ndarray:
+        '''Vectorized ::meth::Game.Game.won()
+
+        Returns:
+           np.ndarray: (N,) True for every won board
+        '''
+        heights = self.heights.astype(np.int64)
+        towers = (heights == 7) & (self.top(self.summarize()['run']) == 7)
+
+        return np.all((heights == 0) | towers, axis=1)
+
+    def move_heights(self) -> np.ndarray:
+        '''Height every stack would move: its whole consecutive stack on top
+
+        Returns:
+           np.ndarray: (N, columns) heights (0 for empty stacks)
+        '''
+        return np.where(self.heights > 0, self.top(self.summarize()['run']), 0)
+
+    def move_mask(self) -> np.ndarray:
+        '''Vectorized ::meth::Game.Game.is_valid_move() for every src/dest pair
+
+        The only height that can move from a stack is given by
+        ::meth::BoardBatch.move_heights()
+
+        Returns:
+           np.ndarray: (N, src, dest) True where the move is legal
+        '''
+        summary = self.summarize()
+        heights = self.heights.astype(np.int64)
+        run = self.top(summary['run'])
+
+        # Bottom block of the moving stack and top block of every destination.
+        # A consecutive stack has a single color, so both use the top color
+        colors = self.top(self.colors)
+        base = self.top(summary['base'])
+        target = self.top(self.numbers)
+
+        has_blocks = heights > 0
+        whole_stack = run == heights
+
+        onto_empty = (~has_blocks)[:, None, :] & ~whole_stack[:, :, None]
+        onto_block = has_blocks[:, None, :] \
+                & (colors[:, :, None] == colors[:, None, :]) \
+                & (base[:, :, None] < target[:, None, :])
+
+        columns = heights.shape[1]
+        mask = has_blocks[:, :, None] & (onto_empty | onto_block)
+        mask &= ~np.eye(columns, dtype=bool)[None, :, :]
+
+        return mask
+
+    def possible_moves(self, index: int) -> list:
+        '''Legal moves of a single entry, in ::meth::Game.Game.possible_moves() order
+
+        Args:
+           index(int): Entry of the batch
+
+        Returns:
+           list: (src, dest, height) moves
+        '''
+        heights = self.move_heights()[index]
+
+        return [(int(src), int(dest), int(heights[src])) for src, dest in np.argwhere(self.move_mask()[index])]
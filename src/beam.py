@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Beam search solver
+
+A middle ground between the greedy loop of ::func::main.solve() and the
+exact searches in ::mod::optimal: every ply keeps the width best boards by
+::meth::Game.Game.static_evaluation(), so the cost grows linearly with the
+amount of moves instead of exponentially.
+'''
+
+import argparse
+import heapq
+import sys
+
+import Game
+import board
+import ordering as move_ordering
+
+
+def beam_search(game: Game.Game, width: int = 64, max_depth: int = 60, symmetric: bool = False,
+        ordering: move_ordering.MoveOrdering = None):
+    '''Keeps the best width boards of every ply until one of them is won
+
+    Children are scored in bulk with ::meth::Game.Game.evaluate_move(), so
+    only the ones that make it into the next beam are actually built. Boards
+    already reached in an earlier ply (or twice in the same one) are dropped,
+    and children with the same score are kept in ordering rank.
+
+    Args:
+       game(Game.Game): Game to solve (it is not modified)
+       width(int): Boards kept on every ply, trading time for quality
+       max_depth(int): Give up after this many plies
+       symmetric(bool): Consider boards that only differ by column order or
+        color names duplicates (see ::func::board.canonical())
+       ordering(ordering.MoveOrdering): Ranks the moves of every board, a new
+        one by default. Moves kept in the beam that raise the score of their
+        board are reported to it
+
+    Returns:
+       (moves, game): Moves to the first won board found, or to the best scored
+       board if none was won, and that board
+    '''
+    start = game.copy()
+    if start.won():
+        return [], start
+
+    key = board.canonical_key if symmetric else (lambda position: position.key)
+
+    if ordering is None:
+        ordering = move_ordering.MoveOrdering()
+
+    # Entries are (score, moves, game)
+    beam = [(start.static_evaluation(), (), start)]
+    best = beam[0]
+    seen = {key(start)}
+
+    for depth in range(max_depth):
+        candidates = list()
+        order = 0
+
+        for score, moves, position in beam:
+            for possible_move in ordering.order(position, depth=depth):
+                undo = position.make_move(*possible_move)
+                child_key = key(position)
+                position.unmake_move(undo)
+
+                if child_key in seen:
+                    continue
+                seen.add(child_key)
+
+                # Ties keep the order in which children were ranked
+                candidates.append((position.evaluate_move(*possible_move), -order, moves, position, possible_move))
+                order += 1
+
+        if not candidates:
+            break
+
+        next_beam = list()
+        for score, _, moves, position, possible_move in heapq.nlargest(width, candidates, key=lambda c: c[:2]):
+            child = position.copy()
+            child.move(*possible_move)
+            next_beam.append((score, moves + (possible_move,), child))
+
+            if score > position.static_evaluation():
+                ordering.improved(possible_move, depth, max_depth - depth)
+
+            if child.won():
+                return list(moves + (possible_move,)), child
+
+        beam = next_beam
+
+        if beam[0][0] > best[0]:
+            best = beam[0]
+
+    return list(best[1]), best[2]
+
+
+def main(argv=None):
+    '''Prints the beam search solution of a puzzle file
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+    '''
+    parser = argparse.ArgumentParser(description="Solves a puzzle with beam search")
+    parser.add_argument('puzzle', nargs='?', default="../input/stacks.txt", help='puzzle file')
+    parser.add_argument('-k', '--width', type=int, default=64, help='boards kept per ply (default: 64)')
+    parser.add_argument('-d', '--max-depth', type=int, default=60, help='maximum amount of moves (default: 60)')
+    parser.add_argument('--symmetric', action='store_true', help='merge symmetric boards')
+    args = parser.parse_args(argv)
+
+    moves, final_game = beam_search(Game.Game(args.puzzle), args.width, args.max_depth, args.symmetric)
+
+    for possible_move in moves:
+        print(possible_move)
+
+    final_game.print_stacks()
+    print(f"{'Solved' if final_game.won() else 'Not solved'} in {len(moves)} moves, score {final_game.static_evaluation()}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Reproducible benchmarks for the hot paths of the solver
+
+Every benchmark is warmed up, calibrated so a sample takes at least
+min_time seconds, and then repeated to get timing statistics. Results can be
+written as JSON and compared with an earlier run.
+
+Example:
+   python bench.py --json after.json --compare before.json
+'''
+
+import argparse
+import json
+import os.path
+import platform
+import statistics
+import sys
+import time
+
+import Game
+import main
+
+
+root_dir = os.path.normpath(os.path.join(os.path.abspath(os.path.dirname(__file__)), '..'))
+default_puzzles = ['simp.txt', 'simp2.txt', 'stacks.txt']
+
+
+def timed(function, number: int) -> float:
+    '''Seconds taken to call function number times'''
+    start = time.perf_counter()
+
+    for _ in range(number):
+        function()
+
+    return time.perf_counter() - start
+
+
+def measure(function, warmup: int = 3, repeat: int = 5, min_time: float = 0.05) -> dict:
+    '''Timing statistics of a function without arguments
+
+    Args:
+       function(callable): Operation to time
+       warmup(int): Calls made before measuring
+       repeat(int): Amount of samples
+       min_time(float): Minimum seconds per sample, used to pick the amount of
+        calls in every sample
+
+    Returns:
+       dict: Calls per sample and min/median/mean/stdev seconds per call, plus
+       ops_per_sec (based on the median)
+    '''
+    for _ in range(warmup):
+        function()
+
+    number = 1
+    while timed(function, number) < min_time:
+        number *= 2
+
+    samples = [timed(function, number) / number for _ in range(repeat)]
+    median = statistics.median(samples)
+
+    return {
+            'number': number,
+            'repeat': repeat,
+            'min': min(samples),
+            'median': median,
+            'mean': statistics.mean(samples),
+            'stdev': statistics.stdev(samples) if repeat > 1 else 0.0,
+            'ops_per_sec': 1 / median if median else float('inf'),
+            }
+
+
+def count_nodes(position: Game.Game, depth: int) -> int:
+    '''Amount of positions ::func::main.minimax() visits without a table'''
+    if depth == 0 or position.won():
+        return 1
+
+    nodes = 1
+    for possible_move in position.possible_moves():
+        undo = position.make_move(*possible_move)
+
+        if undo is not None:
+            nodes += count_nodes(position, depth - 1)
+            position.unmake_move(undo)
+
+    return nodes
+
+
+def benchmarks(game: Game.Game, depths) -> dict:
+    '''Operations measured on a single puzzle
+
+    Args:
+       game(Game.Game): Puzzle to measure
+       depths(list[int]): Depths used for minimax
+
+    Returns:
+       dict: Name -> (function, nodes visited per call or None)
+    '''
+    tallest = max(game.stacks, key=lambda stack: stack.height)
+    half = max(1, tallest.height // 2)
+
+    # Every move that could be asked for, including the invalid ones
+    candidates = [
+            (src, dest, height)
+            for src, stack in enumerate(game.stacks)
+            for dest in range(len(game.stacks))
+            for height in range(1, stack.height + 1)
+            ]
+
+    def valid_moves():
+        for candidate in candidates:
+            game.is_valid_move(*candidate)
+
+    operations = {
+            'Stack.copy': (tallest.copy, None),
+            f'Stack.top({half})': (lambda: tallest.top(half), None),
+            f'Game.is_valid_move x{len(candidates)}': (valid_moves, None),
+            'Game.possible_moves': (lambda: list(game.possible_moves()), None),
+            'Game.static_evaluation': (game.static_evaluation, None),
+            'Game.copy': (game.copy, None),
+            }
+
+    for depth in depths:
+        operations[f'main.minimax(depth={depth})'] = (
+                lambda depth=depth: main.minimax(game, depth),
+                count_nodes(game, depth)
+                )
+
+    return operations
+
+
+def run(puzzles, depths, warmup: int, repeat: int, min_time: float, output=sys.stdout) -> dict:
+    '''Runs every benchmark on every puzzle, printing a line per result
+
+    Args:
+       puzzles(list[str]): Puzzle files
+       depths(list[int]): Depths used for minimax
+       warmup(int): Calls made before measuring
+       repeat(int): Amount of samples
+       min_time(float): Minimum seconds per sample
+       output(file): Where the report is printed
+
+    Returns:
+       dict: JSON-ready report with the environment and every result
+    '''
+    report = {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': list(),
+            }
+
+    for file_name in puzzles:
+        game = Game.Game(file_name)
+
+        for name, (function, nodes) in benchmarks(game, depths).items():
+            result = measure(function, warmup, repeat, min_time)
+            result['puzzle'] = os.path.basename(file_name)
+            result['name'] = name
+
+            line = f"{result['puzzle']:12} {name:38} {result['ops_per_sec']:14,.1f} ops/s  ±{result['stdev'] / result['median']:6.1%}"
+
+            if nodes is not None:
+                result['nodes'] = nodes
+                result['nodes_per_sec'] = nodes * result['ops_per_sec']
+                line += f"  {result['nodes_per_sec']:14,.1f} nodes/s"
+
+            print(line, file=output)
+            report['results'].append(result)
+
+    return report
+
+
+def compare(report: dict, baseline: dict, output=sys.stdout):
+    '''Prints the speedup of every result against an earlier report
+
+    Args:
+       report(dict): Current report
+       baseline(dict): Report loaded from an earlier --json file
+       output(file): Where the comparison is printed
+    '''
+    before = {(result['puzzle'], result['name']): result for result in baseline['results']}
+
+    for result in report['results']:
+        previous = before.get((result['puzzle'], result['name']))
+
+        if previous is not None:
+            print(f"{result['puzzle']:12} {result['name']:38} {previous['median'] / result['median']:8.2f}x", file=output)
+
+
+def cli(argv=None) -> int:
+    '''Command line entry point
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+
+    Returns:
+       int: Exit status
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('puzzles', nargs='*',
+            default=[os.path.join(root_dir, 'input', name) for name in default_puzzles],
+            help='puzzle files (default: simp.txt, simp2.txt and stacks.txt)')
+    parser.add_argument('--depths', default='1,2,3',
+            help='comma separated minimax depths (default: 1,2,3)')
+    parser.add_argument('--warmup', type=int, default=3, help='calls before measuring (default: 3)')
+    parser.add_argument('--repeat', type=int, default=5, help='samples per benchmark (default: 5)')
+    parser.add_argument('--min-time', type=float, default=0.05,
+            help='minimum seconds per sample (default: 0.05)')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--compare', help='earlier --json report to compare against')
+    args = parser.parse_args(argv)
+
+    depths = [int(depth) for depth in args.depths.split(',') if depth]
+    report = run(args.puzzles, depths, args.warmup, args.repeat, args.min_time)
+
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(report, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as fp:
+            print()
+            compare(report, json.load(fp))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
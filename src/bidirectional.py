@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Bidirectional (meet in the middle) search between a puzzle and its solution
+
+The won boards are fully known: one 6 to 0 tower per color, with the empty
+columns anywhere. So besides searching forward from the puzzle with
+::meth::Game.Game.possible_moves(), this solver searches backward from a won
+board with reverse moves (::func::bidirectional.reverse_moves()). Each side
+only has to reach half of the solution depth before they meet, which is
+exponentially cheaper than a single search of the full depth.
+
+Positions are keyed by their sorted columns, since reordering the columns
+changes neither the moves that are possible nor whether the game is won. That
+makes every won board the same key, and the column order is put back when the
+two halves of the solution are joined.
+'''
+
+import argparse
+import sys
+
+import Game
+import board
+
+
+def column_key(board_columns) -> bytes:
+    '''Key shared by every board with the same columns, in any order'''
+    return board.join(sorted(board_columns))
+
+
+def top_run(column: bytes) -> int:
+    '''Height of the consecutive run on top of a column (see ::meth::Game.Stack.runHeight())'''
+    height = len(column)
+    run = 1 if height else 0
+
+    # One number more on the same color is exactly one code more
+    while run < height and column[height - run - 1] == column[height - run] + 1:
+        run += 1
+
+    return run
+
+
+def reverse_moves(board_columns) -> list:
+    '''Every move that leads to a board, with the board it was played from
+
+    A move takes the whole consecutive run on top of src, so the moved blocks
+    are consecutive and, once back on src, the block under them must not
+    continue their run. The rules of ::meth::Game.Game.is_valid_move() also
+    apply to the board before the move: the run lands on a bigger block of
+    its own color, or on an empty column as long as src is not left empty.
+
+    Args:
+       board_columns(list[bytes]): Columns of the board after the move, bottom to top
+
+    Returns:
+       list: ((src, dest, height), columns before the move) pairs, where
+       playing the move on those columns gives board_columns
+    '''
+    predecessors = list()
+
+    for dest, column in enumerate(board_columns):
+        run = top_run(column)
+
+        for height in range(1, run + 1):
+            moved = column[len(column) - height:]
+            below = column[:len(column) - height]
+            base = moved[0]
+
+            # It landed on a bigger block of the same color (codes of other
+            # colors are at least 10 apart)
+            if below and not (below[-1] // 10 == base // 10 and below[-1] > base):
+                continue
+
+            for src, source in enumerate(board_columns):
+                if src == dest:
+                    continue
+
+                # The whole run moves, so it did not continue the block under it
+                if source and source[-1] == base + 1:
+                    continue
+
+                # An empty column only takes a run that does not empty src
+                if not below and not source:
+                    continue
+
+                before = list(board_columns)
+                before[src] = source + moved
+                before[dest] = below
+                predecessors.append(((src, dest, height), before))
+
+    return predecessors
+
+
+def goal_columns(game: Game.Game):
+    '''A won board with the blocks of a game, or None if they cannot form one
+
+    Args:
+       game(Game.Game): Puzzle to solve
+
+    Returns:
+       list[bytes] or None: Columns with a 6 to 0 tower per color, and the
+       empty columns last
+    '''
+    codes = sorted(board.encode(game).replace(bytes([board.SEPARATOR]), b''))
+    colors = sorted({code // 10 for code in codes})
+
+    towers = [bytes(color * 10 + number for number in range(6, -1, -1)) for color in colors]
+    if sorted(b''.join(towers)) != codes or len(towers) > len(game.stacks):
+        return None
+
+    return towers + [b''] * (len(game.stacks) - len(towers))
+
+
+def column_permutation(source, target) -> list:
+    '''Maps the columns of a board to the same columns in another order
+
+    Args:
+       source(list[bytes]): Columns of a board
+       target(list[bytes]): The same columns, in any order
+
+    Returns:
+       list[int]: Index in target of every column of source
+    '''
+    free = dict()
+
+    for index, column in enumerate(target):
+        free.setdefault(column, list()).append(index)
+
+    return [free[column].pop(0) for column in source]
+
+
+def expand(frontier: list, side: dict, other: dict, step) -> tuple:
+    '''Expands a whole layer of one side of the search
+
+    Args:
+       frontier(list[bytes]): Keys of the layer
+       side(dict): Key -> (columns, next key, move, depth) of this side
+       other(dict): The same for the other side
+       step(callable): columns -> list of (move, columns) neighbours
+
+    Returns:
+       (layer, meetings): Keys of the next layer and the keys also reached by
+       the other side
+    '''
+    layer = list()
+    meetings = list()
+
+    for key in frontier:
+        board_columns, _, _, depth = side[key]
+
+        for possible_move, neighbour in step(board_columns):
+            neighbour_key = column_key(neighbour)
+
+            if neighbour_key in side:
+                continue
+
+            side[neighbour_key] = (neighbour, key, possible_move, depth + 1)
+            layer.append(neighbour_key)
+
+            if neighbour_key in other:
+                meetings.append(neighbour_key)
+
+    return layer, meetings
+
+
+def forward_moves(board_columns) -> list:
+    '''Every move of a board, with the board it leads to'''
+    position = board.decode(board.join(board_columns))
+    neighbours = list()
+
+    for possible_move in position.possible_moves():
+        undo = position.make_move(*possible_move)
+
+        if undo is not None:
+            neighbours.append((possible_move, board.columns(board.encode(position))))
+            position.unmake_move(undo)
+
+    return neighbours
+
+
+def bidirectional(game: Game.Game, max_nodes: int = None):
+    '''Shortest solution, searching from both the puzzle and a won board
+
+    Whole layers are expanded at a time, always on the side with the smaller
+    frontier, and the search stops at the end of the first layer where the
+    sides meet, keeping the shortest joined path.
+
+    Args:
+       game(Game.Game): Game to solve (it is not modified)
+       max_nodes(int): Give up after storing this many positions on both sides
+
+    Returns:
+       list or None: Shortest list of (src, dest, height) moves, or None if
+       there is no solution (or max_nodes was reached)
+    '''
+    start = board.columns(board.encode(game))
+    goal = goal_columns(game)
+
+    if goal is None:
+        return None
+
+    # Key -> (columns, key of the neighbour it was reached from, move, depth).
+    # Forward moves go from the neighbour to the board, backward ones from
+    # the board to the neighbour
+    forward = {column_key(start): (start, None, None, 0)}
+    backward = {column_key(goal): (goal, None, None, 0)}
+    frontiers = {True: list(forward), False: list(backward)}
+
+    meetings = [key for key in forward if key in backward]
+
+    while not meetings:
+        if not frontiers[True] or not frontiers[False]:
+            return None
+
+        if max_nodes is not None and len(forward) + len(backward) > max_nodes:
+            return None
+
+        is_forward = len(frontiers[True]) <= len(frontiers[False])
+
+        if is_forward:
+            frontiers[True], meetings = expand(frontiers[True], forward, backward, forward_moves)
+        else:
+            frontiers[False], meetings = expand(frontiers[False], backward, forward, reverse_moves)
+
+    meeting = min(meetings, key=lambda key: forward[key][3] + backward[key][3])
+    return join_paths(forward, backward, meeting)
+
+
+def join_paths(forward: dict, backward: dict, meeting: bytes) -> list:
+    '''Moves from the start to the meeting position, then on to the won board
+
+    Both sides may have reached the meeting position with its columns in a
+    different order, so the backward moves are renamed to the column order
+    of the forward side.
+
+    Args:
+       forward(dict): Forward side of ::func::bidirectional.bidirectional()
+       backward(dict): Backward side
+       meeting(bytes): Key reached by both sides
+
+    Returns:
+       list: (src, dest, height) moves
+    '''
+    moves = list()
+    key = meeting
+
+    while forward[key][1] is not None:
+        _, parent, possible_move, _ = forward[key]
+        moves.append(possible_move)
+        key = parent
+
+    moves.reverse()
+
+    # Column of the backward board -> column of the forward board
+    rename = column_permutation(backward[meeting][0], forward[meeting][0])
+    key = meeting
+
+    while backward[key][1] is not None:
+        _, child, (src, dest, height), _ = backward[key]
+        moves.append((rename[src], rename[dest], height))
+        key = child
+
+    return moves
+
+
+def main(argv=None):
+    '''Prints the bidirectional solution of a puzzle file
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+    '''
+    parser = argparse.ArgumentParser(description="Solves a puzzle searching from both ends")
+    parser.add_argument('puzzle', nargs='?', default="../input/stacks.txt", help='puzzle file')
+    parser.add_argument('-n', '--max-nodes', type=int, help='give up after storing this many positions')
+    args = parser.parse_args(argv)
+
+    game = Game.Game(args.puzzle)
+    moves = bidirectional(game, args.max_nodes)
+
+    if moves is None:
+        print("No solution found")
+        return
+
+    for possible_move in moves:
+        print(possible_move)
+        game.move(*possible_move)
+
+    game.print_stacks()
+    print(f"Solved in {len(moves)} moves")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
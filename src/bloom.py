@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Fixed size set of visited positions
+
+Long searches that remember every position they visit in a Python set grow
+without bound. A Bloom filter answers the same "was this visited?" question
+with a bit array sized up front: it never forgets a position, and only
+sometimes (with a chosen probability) claims to have seen a position it did
+not. Keys are the 64 bit Zobrist keys of ::attr::Game.Game.key.
+'''
+
+import math
+
+
+mask = 2**64 - 1
+
+
+def mix(key: int) -> int:
+    '''Scrambles a 64 bit key (splitmix64 finalizer), so nearby keys spread out'''
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & mask
+
+    return key ^ (key >> 31)
+
+
+def step_key(key: int, possible_move) -> int:
+    '''64 bit key of playing a move from a position
+
+    Args:
+       key(int): Zobrist key of the position
+       possible_move(tuple): (src, dest, height) move
+
+    Returns:
+       int: Key to store (state, move) pairs in a ::class::BloomFilter
+    '''
+    src, dest, height = possible_move
+
+    return mix(key ^ (src << 58 | dest << 52 | height << 44 | 1 << 40))
+
+
+class BloomFilter:
+    '''Bloom filter over 64 bit keys
+
+    Every key sets hashes bits, picked by double hashing two halves of its
+    mixed value, so a lookup costs a few bit tests no matter how full it is.
+
+    Attributes:
+       bits(bytearray): The bit array
+       size(int): Amount of bits
+       hashes(int): Bits set per key
+       count(int): Keys added that were not already (seemingly) present
+    '''
+    __slots__ = ['bits', 'size', 'hashes', 'count']
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        '''Sizes the filter for an amount of keys
+
+        Args:
+           capacity(int): Keys expected to be added
+           error_rate(float): Chance of a false positive once capacity keys were added
+
+        Raises:
+           ValueError: If the capacity or the error rate are out of range
+        '''
+        if capacity <= 0:
+            raise ValueError(f"Expected capacity {capacity} to be greater than 0")
+
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Expected error_rate {error_rate} to be between 0 and 1")
+
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2)**2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key: int):
+        '''Bit indices of a key'''
+        key = mix(key)
+        first = key & 0xFFFFFFFF
+        second = (key >> 32) | 1
+
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: int) -> bool:
+        '''Adds a key
+
+        Args:
+           key(int): 64 bit key
+
+        Returns:
+           bool: True if the key was (probably) already in the filter
+        '''
+        present = True
+
+        for bit in self.positions(key):
+            byte = bit >> 3
+            flag = 1 << (bit & 7)
+
+            if not self.bits[byte] & flag:
+                present = False
+                self.bits[byte] |= flag
+
+        if not present:
+            self.count += 1
+
+        return present
+
+    def __contains__(self, key: int) -> bool:
+        bits = self.bits
+
+        return all(bits[bit >> 3] & (1 << (bit & 7)) for bit in self.positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self):
+        '''Forgets every key'''
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+    def nbytes(self) -> int:
+        '''Memory used by the bit array'''
+        return len(self.bits)
+
+    def false_positive_rate(self) -> float:
+        '''Estimated chance that a key that was never added is reported as present'''
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Packed board encoding for SixTowers games
+
+A board is stored as a plain ``bytes`` object: every column is written from
+bottom to top with one byte per block, and columns are separated by a zero
+byte. Each block byte uses the same ``color * 10 + number`` code as
+:meth:`Game.Block.__hash__`, so it is never zero.
+
+Because the result is ``bytes``, boards are immutable, hashable, comparable,
+cheap to pickle and can be used directly as dictionary keys, multiprocessing
+payloads or storage records.
+'''
+
+import hashlib
+import itertools
+import os.path
+
+import Game
+
+
+SEPARATOR = 0
+
+# Reverse lookup for the color letters used in the input files
+colors_letter = {color: letter for letter, color in Game.colors_abbrev.items()}
+
+# Blocks never change after creation, so decoding can share these instances
+blocks = {
+        color.value * 10 + number: Game.Block(number, color)
+        for color in Game.BlockColors
+        for number in range(7)
+        }
+
+
+def encode_block(block: Game.Block) -> int:
+    '''Byte code of a single block
+
+    Args:
+       block(Game.Block): Block to encode
+
+    Returns:
+       int: Code between 10 and 66 (color * 10 + number)
+    '''
+    return block.color.value * 10 + block.number
+
+
+def encode(game: Game.Game) -> bytes:
+    '''Packs a game into its compact board representation
+
+    Args:
+       game(Game.Game): Game to encode
+
+    Returns:
+       bytes: Packed board
+    '''
+    packed = bytearray()
+
+    for column, stack in enumerate(game.stacks):
+        if column:
+            packed.append(SEPARATOR)
+
+        # Stacks iterate from the top, boards are stored from the bottom
+        packed.extend(reversed([encode_block(block) for block in stack]))
+
+    return bytes(packed)
+
+
+def columns(board: bytes) -> list:
+    '''Splits a packed board into its columns
+
+    Args:
+       board(bytes): Packed board
+
+    Returns:
+       list[bytes]: Block codes of every column, from bottom to top
+    '''
+    return board.split(bytes([SEPARATOR]))
+
+
+def join(board_columns) -> bytes:
+    '''Inverse of :func:`columns`
+
+    Args:
+       board_columns(iterable[bytes]): Block codes of every column, bottom to top
+
+    Returns:
+       bytes: Packed board
+    '''
+    return bytes([SEPARATOR]).join(board_columns)
+
+
+def decode(board: bytes) -> Game.Game:
+    '''Rebuilds a game from its packed representation
+
+    Args:
+       board(bytes): Packed board
+
+    Returns:
+       Game.Game: New game with the same stacks
+
+    Raises:
+       ValueError: If the board contains an unknown block code
+    '''
+    stacks = list()
+
+    for column in columns(board):
+        stack = Game.Stack()
+
+        for code in column:
+            if code not in blocks:
+                raise ValueError(f"Unknown block code {code} in board")
+            stack.push(blocks[code])
+
+        stacks.append(stack)
+
+    return Game.Game(stacks)
+
+
+def block_text(code: int) -> str:
+    '''Two character notation of a block code, as used in the input files
+
+    Args:
+       code(int): Block code
+
+    Returns:
+       str: Number followed by the color letter (e.g. "4C")
+    '''
+    block = blocks[code]
+    return f"{block.number}{colors_letter[block.color]}"
+
+
+def parse_block(text: str) -> int:
+    '''Inverse of :func:`block_text`
+
+    Args:
+       text(str): Number followed by the color letter (e.g. "4C")
+
+    Returns:
+       int: Block code
+
+    Raises:
+       ValueError: If text is not a valid block
+    '''
+    if len(text) != 2 or not text[0].isdigit() or text[1].upper() not in Game.colors_abbrev:
+        raise ValueError(f"Cannot parse block {text!r}")
+
+    return encode_block(Game.Block(int(text[0]), Game.colors_abbrev[text[1].upper()]))
+
+
+def to_text(board: bytes) -> str:
+    '''One-line notation of a board
+
+    Columns are written from bottom to top and separated by slashes, so empty
+    columns show up as consecutive slashes (e.g. "6C5C4Y3C2C/1Y1C0C//////")
+
+    Args:
+       board(bytes): Packed board
+
+    Returns:
+       str: One-line notation
+    '''
+    return '/'.join(
+            ''.join(block_text(code) for code in column)
+            for column in columns(board)
+            )
+
+
+def from_text(text: str) -> bytes:
+    '''Inverse of :func:`to_text`
+
+    Args:
+       text(str): One-line notation
+
+    Returns:
+       bytes: Packed board
+
+    Raises:
+       ValueError: If a column cannot be parsed
+    '''
+    board_columns = list()
+
+    for column in text.strip().split('/'):
+        if len(column) % 2:
+            raise ValueError(f"Cannot parse column {column!r}")
+
+        board_columns.append(bytes(
+            parse_block(column[i:i + 2]) for i in range(0, len(column), 2)
+            ))
+
+    return join(board_columns)
+
+
+def to_file_text(board: bytes) -> str:
+    '''Board written in the format read by :meth:`Game.Game.parse_from_file`
+
+    Args:
+       board(bytes): Packed board
+
+    Returns:
+       str: One line per row, from bottom to top, with "00" for empty slots
+    '''
+    board_columns = columns(board)
+    max_height = max(len(column) for column in board_columns)
+
+    lines = list()
+    for row in range(max_height):
+        lines.append(','.join(
+            block_text(column[row]) if row < len(column) else '00'
+            for column in board_columns
+            ))
+
+    return '\n'.join(lines) + '\n'
+
+
+def from_file_text(text: str, width: int = 8) -> bytes:
+    '''Packs the contents of a puzzle file without creating a game
+
+    Args:
+       text(str): Contents in the :meth:`Game.Game.parse_from_file` format
+       width(int): Amount of columns of the board
+
+    Returns:
+       bytes: Packed board
+
+    Raises:
+       ValueError: If a block cannot be parsed or a row is too wide
+    '''
+    board_columns = [bytearray() for _ in range(width)]
+
+    # Rows go from bottom to top, the same way parse_from_file pushes them
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+
+        entries = line.split(",")
+        if len(entries) > width:
+            raise ValueError(f"Row {line!r} has more than {width} columns")
+
+        for column, entry in enumerate(entries):
+            entry = entry.strip()
+
+            if entry == "00":
+                continue
+
+            board_columns[column].append(parse_block(entry))
+
+    return join(board_columns)
+
+
+def from_file(file_name: str, width: int = 8) -> bytes:
+    '''Packs a puzzle file without creating a game
+
+    Args:
+       file_name(str): Name of the puzzle file
+       width(int): Amount of columns of the board
+
+    Returns:
+       bytes: Packed board
+
+    Raises:
+       ValueError: When file_name file is not found
+    '''
+    if not os.path.exists(file_name):
+        raise ValueError(f"Cannot find file {file_name}")
+
+    with open(file_name, 'r') as fp:
+        return from_file_text(fp.read(), width)
+
+
+# ---------------------- Symmetries ------------------------------------------
+
+def color_signatures(board_columns) -> dict:
+    '''Describes where the blocks of every color are, ignoring column order
+
+    Args:
+       board_columns(list[bytes]): Columns of a packed board
+
+    Returns:
+       dict: Color value -> sorted tuple of (number, position, column height)
+       of each of its blocks
+    '''
+    found = dict()
+
+    for column in board_columns:
+        height = len(column)
+
+        for position, code in enumerate(column):
+            found.setdefault(code // 10, []).append((code % 10, position, height))
+
+    return {color: tuple(sorted(places)) for color, places in found.items()}
+
+
+def canonical(board: bytes) -> bytes:
+    '''Symmetry-reduced version of a packed board
+
+    Columns are interchangeable and the rules only ever compare colors for
+    equality, so permuting columns or renaming colors leaves the puzzle the
+    same. Two boards have the same canonical form exactly when one can be
+    turned into the other that way.
+
+    Colors are renamed in the order of their :func:`color_signatures`, and
+    columns are sorted afterwards. Colors with the same signature are tried in
+    every order, keeping the smallest result.
+
+    Args:
+       board(bytes): Packed board
+
+    Returns:
+       bytes: Packed board of the canonical representative
+    '''
+    board_columns = columns(board)
+    signatures = sorted((signature, color) for color, signature in color_signatures(board_columns).items())
+
+    # Colors that cannot be told apart by their signature form a group
+    groups = list()
+    for index, (signature, color) in enumerate(signatures):
+        if index and signature == signatures[index - 1][0]:
+            groups[-1].append(color)
+        else:
+            groups.append([color])
+
+    best = None
+    for order in itertools.product(*[itertools.permutations(group) for group in groups]):
+        # Byte translation table that renames every block code at once
+        renamed = bytearray(range(256))
+        for new_color, color in enumerate(itertools.chain(*order), start=1):
+            for number in range(10):
+                renamed[color * 10 + number] = new_color * 10 + number
+
+        candidate = join(sorted(column.translate(renamed) for column in board_columns))
+
+        if best is None or candidate < best:
+            best = candidate
+
+    return best
+
+
+def canonical_key(game: Game.Game) -> bytes:
+    '''Symmetry-reduced key of a game, see :func:`canonical`
+
+    Args:
+       game(Game.Game): Game to describe
+
+    Returns:
+       bytes: Packed canonical board
+    '''
+    return canonical(encode(game))
+
+
+def canonical_hash(game: Game.Game) -> int:
+    '''Fixed width version of :func:`canonical_key`
+
+    Unlike hash(), the digest is the same in every process, so it can be
+    stored or shared between workers
+
+    Args:
+       game(Game.Game): Game to describe
+
+    Returns:
+       int: 64 bit digest of the canonical board
+    '''
+    return int.from_bytes(hashlib.blake2b(canonical_key(game), digest_size=8).digest(), 'little')
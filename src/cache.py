@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Persistent cache of solutions, shared between runs and processes
+
+Maps packed boards (see ::func::board.encode()) to the best known move
+sequence from them, stored in a SQLite file. The database is opened in WAL
+mode, so any amount of processes can read it while one of them writes.
+
+When a solution is stored, every position along it is stored too, with the
+rest of the moves. ::func::main.solve() checks the cache before every step, so
+a repeated puzzle returns right away and a new one stops searching as soon as
+it reaches a position that was solved before.
+'''
+
+import json
+import os.path
+import sqlite3
+import time
+
+import Game
+import board
+
+
+root_dir = os.path.normpath(os.path.join(os.path.abspath(os.path.dirname(__file__)), '..'))
+default_path = os.path.join(root_dir, 'solutions.sqlite')
+
+schema = '''
+CREATE TABLE IF NOT EXISTS solutions (
+    board BLOB PRIMARY KEY,
+    moves TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used);
+'''
+
+
+class SolutionCache:
+    '''Least recently used cache of solutions in a SQLite file
+
+    A solution replaces the stored one only if it is better: won before not
+    won, then fewer moves, then a higher final score.
+
+    Attributes:
+       path(str): Database file
+       max_entries(int): Positions kept before the least recently used are evicted
+       hits(int): Lookups that found a solution
+       misses(int): Lookups that did not
+       touch_batch(int): Lookups whose recency is written to the file at once
+    '''
+
+    def __init__(self, path: str = default_path, max_entries: int = 1_000_000, timeout: float = 30.0,
+            touch_batch: int = 256):
+        '''Opens (or creates) a cache file
+
+        Args:
+           path(str): Database file, ":memory:" for a private in-memory cache
+           max_entries(int): Positions kept before evicting
+           timeout(float): Seconds to wait for another process that is writing
+           touch_batch(int): Hits to collect before their recency is written,
+            so lookups do not take the write lock of the file every time
+        '''
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.touch_batch = touch_batch
+
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(schema)
+
+        # Entries loaded by ::meth::SolutionCache.warm(), checked before the file
+        self.memory = dict()
+        # Packed board -> time of its last hit, not yet written to the file
+        self.touched = dict()
+        self.size = self.count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''Writes the pending recency updates and closes the database file'''
+        self.flush()
+        self.connection.close()
+
+    def flush(self):
+        '''Writes the recency of the hits collected so far in a single transaction'''
+        if not self.touched:
+            return
+
+        with self.connection:
+            self.connection.executemany('UPDATE solutions SET used = ? WHERE board = ?',
+                    [(used, packed) for packed, used in self.touched.items()])
+
+        self.touched.clear()
+
+    def count(self) -> int:
+        '''Amount of positions stored in the file'''
+        return self.connection.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __contains__(self, game: Game.Game) -> bool:
+        packed = board.encode(game)
+
+        return packed in self.memory or self.connection.execute(
+                'SELECT 1 FROM solutions WHERE board = ?', (packed,)).fetchone() is not None
+
+    def get(self, game: Game.Game):
+        '''Best known solution from a position
+
+        Args:
+           game(Game.Game): Position to look up
+
+        Returns:
+           (moves, score, won): Moves from the position, final score and whether
+           they win, or None if the position is not cached
+        '''
+        packed = board.encode(game)
+        entry = self.memory.get(packed)
+
+        if entry is None:
+            row = self.connection.execute(
+                    'SELECT moves, score, won FROM solutions WHERE board = ?', (packed,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            entry = ([tuple(possible_move) for possible_move in json.loads(row[0])], row[1], bool(row[2]))
+
+        self.hits += 1
+
+        # Recency only decides what is evicted, so it is written in batches
+        self.touched[packed] = time.time()
+        if len(self.touched) >= self.touch_batch:
+            self.flush()
+
+        return entry
+
+    def put(self, game: Game.Game, moves, score: int = None, won: bool = None) -> bool:
+        '''Stores a solution from a position, unless a better one is known
+
+        Args:
+           game(Game.Game): Starting position
+           moves(list): (src, dest, height) moves from it
+           score(int): Final ::meth::Game.Game.static_evaluation(), computed if missing
+           won(bool): Whether the moves win the game, computed if missing
+
+        Returns:
+           bool: True if the solution was stored
+        '''
+        return self.put_path(game, moves, score, won, every_position=False) > 0
+
+    def put_path(self, game: Game.Game, moves, score: int = None, won: bool = None,
+            every_position: bool = True) -> int:
+        '''Stores a solution and, by default, the rest of it from every position on the way
+
+        Args:
+           game(Game.Game): Starting position (it is not modified)
+           moves(list): (src, dest, height) moves from it
+           score(int): Final ::meth::Game.Game.static_evaluation(), computed if missing
+           won(bool): Whether the moves win the game, computed if missing
+           every_position(bool): Also store the positions reached along the way
+
+        Returns:
+           int: Amount of positions stored or improved (the last position is
+           the won board itself, which needs no moves, so it is not stored)
+        '''
+        moves = [tuple(possible_move) for possible_move in moves]
+        position = game.copy()
+        entries = [(board.encode(position), moves)]
+
+        for index, possible_move in enumerate(moves):
+            position.move(*possible_move)
+
+            if every_position and index + 1 < len(moves):
+                entries.append((board.encode(position), moves[index + 1:]))
+
+        if score is None:
+            score = position.static_evaluation()
+
+        if won is None:
+            won = position.won()
+
+        now = time.time()
+        stored = 0
+
+        with self.connection:
+            for packed, rest in entries:
+                stored += self.connection.execute('''
+                    INSERT INTO solutions (board, moves, length, score, won, used) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (board) DO UPDATE SET
+                        moves = excluded.moves, length = excluded.length, score = excluded.score,
+                        won = excluded.won, used = excluded.used
+                    WHERE (excluded.won, -excluded.length, excluded.score) > (won, -length, score)
+                    ''', (packed, json.dumps(rest), len(rest), score, int(won), now)).rowcount
+
+                # The stored solution may have improved, so it is read from the file next time
+                self.memory.pop(packed, None)
+
+        self.size += stored
+        if self.size > self.max_entries:
+            self.evict()
+
+        return stored
+
+    def evict(self) -> int:
+        '''Removes the least recently used positions above max_entries
+
+        Returns:
+           int: Amount of positions removed
+        '''
+        self.flush()
+
+        # Other processes may have added entries too, so the estimate is refreshed
+        self.size = self.count()
+        excess = self.size - self.max_entries
+
+        if excess <= 0:
+            return 0
+
+        with self.connection:
+            removed = self.connection.execute('''
+                DELETE FROM solutions WHERE board IN (SELECT board FROM solutions ORDER BY used LIMIT ?)
+                ''', (excess,)).rowcount
+
+        self.size -= removed
+        self.memory.clear()
+
+        return removed
+
+    def warm(self, limit: int = None) -> int:
+        '''Loads the most recently used won solutions into memory
+
+        Lookups of loaded positions do not touch the file, which makes a batch
+        of repeated puzzles as fast as a dictionary lookup.
+
+        Args:
+           limit(int): Maximum amount of positions to load, all by default
+
+        Returns:
+           int: Amount of positions loaded
+        '''
+        rows = self.connection.execute(
+                'SELECT board, moves, score FROM solutions WHERE won = 1 ORDER BY used DESC LIMIT ?',
+                (-1 if limit is None else limit,))
+
+        for packed, moves, score in rows:
+            self.memory[packed] = ([tuple(possible_move) for possible_move in json.loads(moves)], score, True)
+
+        return len(self.memory)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Exhaustive breadth first search that keeps its frontier on disk
+
+Every layer of the search (the positions exactly n moves away from the start)
+is a file of sorted, fixed width packed boards (see ::func::board.encode();
+every position reachable from a puzzle has the same amount of blocks and
+columns, so the same length). A layer is built by
+
+1. expanding the previous layer in chunks, writing every chunk of children as
+   a sorted run file
+2. merging the runs, dropping duplicates and every position of an earlier
+   layer (kept merged in a single sorted "visited" file)
+
+Only one chunk is ever held in memory, so memory stays bounded by
+run_records no matter how big the state space is. On disk, only the last two
+layers and the visited file are kept once a layer is merged. Progress is saved after
+every run and every layer, and files are written under a temporary name and
+then renamed, so an interrupted search resumes where it stopped.
+
+Example:
+   python external_bfs.py ../input/stacks.txt --work-dir /tmp/bfs
+'''
+
+import argparse
+import heapq
+import json
+import os
+import sys
+
+import Game
+import board
+
+
+root_dir = os.path.normpath(os.path.join(os.path.abspath(os.path.dirname(__file__)), '..'))
+default_work_dir = os.path.join(root_dir, 'bfs')
+
+def read_records(path: str, size: int, skip: int = 0, buffer_records: int = 4096):
+    '''Yields the fixed width records of a file
+
+    Args:
+       path(str): File to read
+       size(int): Bytes per record
+       skip(int): Records to skip from the start
+       buffer_records(int): Records read from disk at once
+    '''
+    with open(path, 'rb') as fp:
+        fp.seek(skip * size)
+
+        while True:
+            chunk = fp.read(size * buffer_records)
+            if not chunk:
+                return
+
+            for start in range(0, len(chunk), size):
+                yield chunk[start:start + size]
+
+
+def write_records(path: str, records) -> int:
+    '''Writes records to a file atomically (to path + '.tmp', then renamed)
+
+    Args:
+       path(str): File to write
+       records(iterable[bytes]): Records, already in order
+
+    Returns:
+       int: Amount of records written
+    '''
+    count = 0
+
+    with open(path + '.tmp', 'wb') as fp:
+        buffer = list()
+
+        for record in records:
+            buffer.append(record)
+            count += 1
+
+            if len(buffer) == 4096:
+                fp.write(b''.join(buffer))
+                buffer.clear()
+
+        fp.write(b''.join(buffer))
+
+    os.replace(path + '.tmp', path)
+    return count
+
+
+def merge_unique(*sources):
+    '''Merges sorted iterables, yielding every record once'''
+    previous = None
+
+    for record in heapq.merge(*sources):
+        if record != previous:
+            yield record
+            previous = record
+
+
+def difference(source, excluded):
+    '''Records of a sorted iterable that are not in another sorted iterable'''
+    excluded = iter(excluded)
+    current = next(excluded, None)
+
+    for record in source:
+        while current is not None and current < record:
+            current = next(excluded, None)
+
+        if record != current:
+            yield record
+
+
+class ExternalBFS:
+    '''Layered breadth first search over every position reachable from a game
+
+    Attributes:
+       work_dir(str): Directory with the layer, run and state files
+       run_records(int): Children kept in memory before a run is written
+       state(dict): Progress, saved as state.json in work_dir: the start board,
+        record size, whether boards are symmetry reduced, the size of every
+        finished layer, the first layer with a won position and the progress
+        of the layer being built
+    '''
+
+    def __init__(self, game: Game.Game, work_dir: str, run_records: int = 1_000_000, symmetric: bool = False):
+        '''Starts a new search, or resumes the one saved in work_dir
+
+        Args:
+           game(Game.Game): Starting position
+           work_dir(str): Directory for the search files (created if needed)
+           run_records(int): Children kept in memory before a run is written
+           symmetric(bool): Store boards reduced by ::func::board.canonical(),
+            so positions that only differ by column order or color names are
+            only searched once
+
+        Raises:
+           ValueError: If work_dir holds a search of another game
+        '''
+        self.work_dir = work_dir
+        self.run_records = run_records
+        self.key = board.canonical if symmetric else (lambda packed: packed)
+
+        start = self.key(board.encode(game))
+        os.makedirs(work_dir, exist_ok=True)
+
+        if os.path.exists(self.path('state.json')):
+            with open(self.path('state.json'), 'r') as fp:
+                self.state = json.load(fp)
+
+            if self.state['start'] != start.hex() or self.state['symmetric'] != symmetric:
+                raise ValueError(f"Expected {work_dir} to hold a search of the same game")
+
+        else:
+            self.state = {
+                    'start': start.hex(),
+                    'symmetric': symmetric,
+                    'record_size': len(start),
+                    'sizes': [1],
+                    'won_depth': 0 if game.won() else None,
+                    'runs': 0,
+                    'offset': 0,
+                    }
+
+            write_records(self.layer(0), [start])
+            write_records(self.visited(0), [start])
+            self.save()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.work_dir, name)
+
+    def layer(self, depth: int) -> str:
+        '''File of the positions exactly depth moves away from the start'''
+        return self.path(f'layer-{depth:04}.bin')
+
+    def visited(self, depth: int) -> str:
+        '''File of the positions up to depth moves away from the start'''
+        return self.path(f'visited-{depth:04}.bin')
+
+    def run_file(self, depth: int, index: int) -> str:
+        '''Sorted run of children for the layer at depth'''
+        return self.path(f'layer-{depth:04}.run-{index:05}.bin')
+
+    def save(self):
+        '''Writes the progress atomically'''
+        with open(self.path('state.json.tmp'), 'w') as fp:
+            json.dump(self.state, fp, indent=2)
+
+        os.replace(self.path('state.json.tmp'), self.path('state.json'))
+
+    @property
+    def depth(self) -> int:
+        '''Last finished layer'''
+        return len(self.state['sizes']) - 1
+
+    def children(self, packed: bytes):
+        '''Packed boards one move away from a packed board'''
+        position = board.decode(packed)
+
+        for possible_move in position.possible_moves():
+            undo = position.make_move(*possible_move)
+
+            if undo is not None:
+                yield self.key(board.encode(position))
+                position.unmake_move(undo)
+
+    def write_run(self, depth: int, children: set):
+        '''Saves a chunk of children as the next sorted run of a layer'''
+        write_records(self.run_file(depth, self.state['runs']), sorted(children))
+        children.clear()
+
+        self.state['runs'] += 1
+
+    def expand(self, verbose: bool = False) -> int:
+        '''Builds the next layer
+
+        Args:
+           verbose(bool): Print the progress
+
+        Returns:
+           int: Amount of new positions
+        '''
+        depth = self.depth + 1
+        size = self.state['record_size']
+
+        # Expand the previous layer, starting after the last saved run
+        children = set()
+        offset = self.state['offset']
+
+        for packed in read_records(self.layer(depth - 1), size, offset):
+            children.update(self.children(packed))
+            offset += 1
+
+            if len(children) >= self.run_records:
+                self.write_run(depth, children)
+                self.state['offset'] = offset
+                self.save()
+
+        if children:
+            self.write_run(depth, children)
+            self.state['offset'] = offset
+            self.save()
+
+        # Merge the runs, dropping everything that was already visited
+        runs = [self.run_file(depth, index) for index in range(self.state['runs'])]
+        merged = merge_unique(*[read_records(run, size) for run in runs])
+        count = write_records(self.layer(depth), difference(merged, read_records(self.visited(depth - 1), size)))
+
+        write_records(self.visited(depth), merge_unique(
+            read_records(self.visited(depth - 1), size),
+            read_records(self.layer(depth), size)
+            ))
+
+        if self.state['won_depth'] is None and count and any(
+                board.decode(packed).won() for packed in read_records(self.layer(depth), size)):
+            self.state['won_depth'] = depth
+
+        self.state['sizes'].append(count)
+        self.state['runs'] = 0
+        self.state['offset'] = 0
+        self.save()
+
+        # Only the last two layers and the visited file are needed to go on
+        for old in runs + [self.visited(depth - 1)]:
+            os.remove(old)
+
+        if depth >= 2:
+            os.remove(self.layer(depth - 2))
+
+        if verbose:
+            print(f"Depth {depth:3}: {count:,} positions")
+
+        return count
+
+    def run(self, max_depth: int = None, stop_at_win: bool = False, verbose: bool = False) -> dict:
+        '''Expands layers until none is left (or a limit is reached)
+
+        Args:
+           max_depth(int): Stop after this layer
+           stop_at_win(bool): Stop after the first layer with a won position,
+            whose depth is the length of the shortest solution
+           verbose(bool): Print the progress
+
+        Returns:
+           dict: The search state, see ::attr::ExternalBFS.state
+        '''
+        while self.state['sizes'][-1] > 0:
+            if max_depth is not None and self.depth >= max_depth:
+                break
+
+            if stop_at_win and self.state['won_depth'] is not None:
+                break
+
+            self.expand(verbose)
+
+        return self.state
+
+
+def cli(argv=None) -> int:
+    '''Command line entry point
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+
+    Returns:
+       int: Exit status
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('puzzle', nargs='?', default="../input/stacks.txt", help='puzzle file')
+    parser.add_argument('--work-dir', default=default_work_dir,
+            help=f'directory for the layer files (default: {default_work_dir})')
+    parser.add_argument('-d', '--max-depth', type=int, help='stop after this layer')
+    parser.add_argument('--run-records', type=int, default=1_000_000,
+            help='positions kept in memory before writing a run (default: 1000000)')
+    parser.add_argument('--symmetric', action='store_true', help='merge symmetric positions')
+    parser.add_argument('--stop-at-win', action='store_true', help='stop at the first layer with a won position')
+    args = parser.parse_args(argv)
+
+    search = ExternalBFS(Game.Game(args.puzzle), args.work_dir, args.run_records, args.symmetric)
+    state = search.run(args.max_depth, args.stop_at_win, verbose=True)
+
+    print(f"{sum(state['sizes']):,} positions in {len(state['sizes'])} layers")
+    if state['won_depth'] is not None:
+        print(f"Shortest solution: {state['won_depth']} moves")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -1,94 +1,780 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import itertools
+import time
+
 import Game
+import bloom
+import board
+import cache as solution_cache
+import ordering as move_ordering
+import stats as search_stats
+import tablebase as endgame_table
+import transposition
+
+
+class BudgetExceeded(Exception):
+    '''Raised when a search runs out of its ::class::main.SearchBudget'''
+
+
+class SearchBudget:
+    '''Wall clock and node limits shared by every call of a search
+
+    Attributes:
+       deadline(float): time.perf_counter() value after which the search stops, or None
+       max_nodes(int): Amount of positions after which the search stops, or None
+       nodes(int): Positions visited so far
+    '''
+    __slots__ = ['deadline', 'max_nodes', 'nodes']
+
+    def __init__(self, seconds: float = None, max_nodes: int = None):
+        '''Starts the clock
+
+        Args:
+           seconds(float): Wall clock budget, or None for no limit
+           max_nodes(int): Node budget, or None for no limit
+        '''
+        self.deadline = None if seconds is None else time.perf_counter() + seconds
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def spend(self):
+        '''Counts a visited position
+
+        Raises:
+           BudgetExceeded: If the time or the nodes ran out
+        '''
+        self.nodes += 1
+
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded(f"Visited more than {self.max_nodes} positions")
+
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded("Ran out of time")
 
-def minimax(position: Game.Game, depth: int) -> int:
+    def remaining(self) -> float:
+        '''Seconds left before the deadline (0 once it passed), or None without one'''
+        if self.deadline is None:
+            return None
+
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def expired(self) -> bool:
+        '''Whether the time or the nodes ran out, without counting a position'''
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return True
+
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+
+def minimax(position: Game.Game, depth: int, table: transposition.TranspositionTable = None,
+        stats: search_stats.SearchStats = None, budget: SearchBudget = None) -> int:
     '''The "max" part of the minimax function
 
     SixTowers doesn't actually have an opponent (or minimizing players), so
     probing and additional optimizations are not available
 
+    Children are explored in place with ::meth::Game.Game.make_move() and
+    ::meth::Game.Game.unmake_move(), so position is back to its original state
+    when the function returns
+
     Args:
        position(Game.Game): Game to use to begin testing alternatives
        depth(int): Current depth of the: Current depth of recursion
+       table(transposition.TranspositionTable): Optional cache of already
+        searched positions
+       stats(stats.SearchStats): Optional counters to update
+       budget(SearchBudget): Optional limits, checked on every position
 
     Returns:
        number(int): Maximum static evaluation after a testing all alternatives
+
+    Raises:
+       BudgetExceeded: If the budget runs out (position is restored first)
     '''
+    if budget is not None:
+        budget.spend()
+
+    if stats is not None:
+        start = time.perf_counter()
 
     if depth == 0 or position.won():
+        if stats is not None:
+            stats.add_leaf(depth, time.perf_counter() - start)
+
         return position.static_evaluation()
 
+    if table is not None:
+        key = table.position_key(position)
+        number = table.probe(key, depth)
+
+        if stats is not None:
+            stats.add_probe(number is not None)
+
+        if number is not None:
+            return number
+
     max_number = -float('inf')
-    
+    generated = 0
+    rejected = 0
+
+    # The generator is only resumed after the move was undone, so it keeps
+    # seeing the original position
     for possible_move in position.possible_moves():
-        position_copy = position.copy()
+        generated += 1
+        undo = position.make_move(*possible_move)
 
-        if position_copy.move(*possible_move):
-            number = minimax(position_copy, depth - 1)
+        if undo is not None:
+            try:
+                number = minimax(position, depth - 1, table, stats, budget)
+            finally:
+                position.unmake_move(undo)
 
             max_number = max([number, max_number])
 
+        else:
+            rejected += 1
+
+    if table is not None:
+        table.store(key, depth, max_number)
+
+    if stats is not None:
+        stats.add_node(depth, generated, rejected, time.perf_counter() - start)
+
+    return max_number
+
+
+# Score of a full 0-6 tower, the highest a single stack can reach
+tower_score = 196
+
+
+def upper_bound(position: Game.Game, depth: int) -> int:
+    '''Optimistic bound on ::func::main.minimax() that does not search
+
+    In depth moves, at most depth stacks can receive blocks, and they can at
+    best become a full tower. Every other stack can only lose blocks, so it
+    can at best reach its ::meth::Game.Stack.peakScore().
+
+    Args:
+       position(Game.Game): Game to estimate
+       depth(int): Remaining search depth
+
+    Returns:
+       int: Value that minimax(position, depth) never exceeds
+    '''
+    if depth == 0 or position.won():
+        return position.static_evaluation()
+
+    peaks = [stack.peakScore() for stack in position.stacks]
+    gains = sorted((tower_score - peak for peak in peaks), reverse=True)
+
+    return sum(peaks) + sum(gains[:depth])
+
+
+def branch_and_bound(position: Game.Game, depth: int, bound: float = -float('inf'),
+        stats: search_stats.SearchStats = None, ordering: move_ordering.MoveOrdering = None) -> int:
+    '''Same value as ::func::main.minimax(), skipping subtrees that cannot win
+
+    Children are tried best first (see ::class::ordering.MoveOrdering), and a
+    child is skipped when its ::func::main.upper_bound() cannot beat the best
+    value found so far. The last level is scored with
+    ::meth::Game.Game.evaluate_move(), without making any move.
+
+    Like the alpha bound of alpha-beta, bound only matters to recursive calls:
+    when the real value is not above it, any value <= bound may be returned.
+
+    Args:
+       position(Game.Game): Game to use to begin testing alternatives (left unchanged)
+       depth(int): Current depth of recursion
+       bound(float): Values <= bound do not need to be exact
+       stats(stats.SearchStats): Optional counters to update
+       ordering(ordering.MoveOrdering): Move ordering shared by the whole
+        search, a new one by default. Moves that raise the best value are
+        reported to it
+
+    Returns:
+       number(int): Maximum static evaluation after testing the alternatives
+       that could beat bound
+    '''
+    if stats is not None:
+        start = time.perf_counter()
+
+    if depth == 0 or position.won():
+        if stats is not None:
+            stats.add_leaf(depth, time.perf_counter() - start)
+
+        return position.static_evaluation()
+
+    moves = list(position.possible_moves())
+    max_number = -float('inf')
+
+    if depth == 1:
+        for possible_move in moves:
+            max_number = max(max_number, position.evaluate_move(*possible_move))
+
+        if stats is not None:
+            stats.add_node(depth, len(moves), 0, time.perf_counter() - start)
+
+        return max_number
+
+    if ordering is None:
+        ordering = move_ordering.MoveOrdering()
+
+    # Best children first, so the bound rises as early as possible
+    pruned = 0
+    for possible_move in ordering.order(position, moves, depth):
+        undo = position.make_move(*possible_move)
+
+        if undo is None:
+            continue
+
+        try:
+            if upper_bound(position, depth - 1) <= max(max_number, bound):
+                pruned += 1
+                continue
+
+            number = branch_and_bound(position, depth - 1, max(max_number, bound), stats, ordering)
+        finally:
+            position.unmake_move(undo)
+
+        if number > max_number:
+            max_number = number
+            ordering.improved(possible_move, depth, depth)
+
+    if stats is not None:
+        stats.add_node(depth, len(moves), 0, time.perf_counter() - start)
+        stats.pruned += pruned
+
     return max_number
 
 
 max_depth = 1
+# Give up on games that take 50% more steps than the known best solution
+max_steps = 29*1.5
+table_bytes = 16 * 2**20
+# Share table entries between boards that only differ by column order or colors.
+# Off by default: the canonical key costs far more per node than the entries
+# it saves (about 200µs against an incremental Zobrist key)
+symmetric_table = False
+# Positions the visited filter of every solve is sized for, and its false positive rate
+visited_positions = 2**16
+visited_error = 0.001
+# Processes used to evaluate the moves of every step (1 evaluates them serially)
+max_workers = 1
 
+# Transposition table of the current worker process, see evaluate_packed
+worker_table = None
 
-def main():
-    ''' Runs game from stacks.txt file and finds solution
 
-    As i'm still optimizing, I'm printing the game on each step
+def evaluate_packed(packed: bytes, possible_move, depth: int, collect_stats: bool = False):
+    '''Minimax value of a single move, meant to run in a worker process
+
+    Args:
+       packed(bytes): Position before the move, see ::func::board.encode()
+       possible_move((src, dest, height)): Move to evaluate
+       depth(int): Depth passed to minimax after the move
+       collect_stats(bool): Also return the counters of the search
+
+    Returns:
+       number(int) or (number, stats.SearchStats): Minimax value of the
+       position after the move, with the counters if collect_stats is set
     '''
+    global worker_table
 
-    base_game = Game.Game("../input/stacks.txt")
+    # Every worker keeps its own table between tasks
+    if worker_table is None:
+        worker_table = transposition.TranspositionTable(table_bytes, symmetric_table)
+
+    position = board.decode(packed)
+    position.move(*possible_move)
+
+    if collect_stats:
+        stats = search_stats.SearchStats()
+        return minimax(position, depth, worker_table, stats), stats
+
+    return minimax(position, depth, worker_table)
+
+
+def move_values(position: Game.Game, depth: int, table: transposition.TranspositionTable = None,
+        executor: ProcessPoolExecutor = None, stats: search_stats.SearchStats = None,
+        prune: bool = False) -> list:
+    '''Minimax value of every possible move from position
+
+    With an executor, the moves are spread over its processes as packed boards.
+    The values (and their order) are the same either way, so the chosen move
+    does not depend on the amount of workers.
+
+    Args:
+       position(Game.Game): Game whose moves will be evaluated (left unchanged)
+       depth(int): Depth passed to minimax after every move
+       table(transposition.TranspositionTable): Optional cache for the serial search
+       executor(ProcessPoolExecutor): Optional pool used to evaluate in parallel
+       stats(stats.SearchStats): Optional counters to update (the position
+        itself is counted one level above depth)
+       prune(bool): Evaluate the serial search with ::func::main.branch_and_bound()
+        (same values, no table)
+
+    Returns:
+       list: (move, number) pairs, in ::meth::Game.Game.possible_moves() order
+    '''
+    if stats is not None:
+        start = time.perf_counter()
+
+    moves = list(position.possible_moves())
+
+    if executor is not None:
+        packed = board.encode(position)
+        results = executor.map(evaluate_packed, itertools.repeat(packed), moves,
+                itertools.repeat(depth), itertools.repeat(stats is not None))
+
+        if stats is None:
+            values = list(zip(moves, results))
+
+        else:
+            values = list()
+            for possible_move, (number, worker_stats) in zip(moves, results):
+                stats.merge(worker_stats)
+                values.append((possible_move, number))
+
+            stats.add_node(depth + 1, len(moves), 0, time.perf_counter() - start)
+
+        return values
+
+    # Siblings share their history and killer moves
+    ordering = move_ordering.MoveOrdering() if prune else None
+
+    values = list()
+    rejected = 0
+    for possible_move in moves:
+        undo = position.make_move(*possible_move)
+
+        if undo is not None:
+            if prune:
+                number = branch_and_bound(position, depth, stats=stats, ordering=ordering)
+            else:
+                number = minimax(position, depth, table, stats)
+
+            values.append((possible_move, number))
+            position.unmake_move(undo)
+
+        else:
+            rejected += 1
+
+    if stats is not None:
+        stats.add_node(depth + 1, len(moves), rejected, time.perf_counter() - start)
 
-    curr_game = base_game.copy()
-    next_game = base_game.copy()
+    return values
 
-    print("Steps: ")
+
+def iterative_deepening(position: Game.Game, seconds: float = None, max_nodes: int = None,
+        depth_limit: int = 100, table: transposition.TranspositionTable = None,
+        stats: search_stats.SearchStats = None):
+    '''Anytime version of ::func::main.move_values() that picks the depth by itself
+
+    Searches depth 0, 1, 2... until the time or node budget runs out. The
+    first search (depth 0) always finishes, so there is always a result.
+
+    Every iteration fills its own values, which replace the previous ones
+    only once the whole iteration finishes, so the moves are never compared
+    at different depths. Moves are tried best first in the order of the last
+    finished iteration, so the previous best move is always searched first.
+    When the budget runs out in the middle of an iteration, the moves it
+    already searched only change the choice if they beat the new value of
+    that best move: they are then ranked above it.
+
+    Args:
+       position(Game.Game): Game whose moves will be evaluated (left unchanged)
+       seconds(float): Wall clock budget, or None for no limit
+       max_nodes(int): Node budget, or None for no limit
+       depth_limit(int): Deepest search to try
+       table(transposition.TranspositionTable): Optional cache shared by every iteration
+       stats(stats.SearchStats): Optional counters to update
+
+    Returns:
+       (values, depth): (move, number) pairs in ::meth::Game.Game.possible_moves()
+       order, with the values of the last iteration that finished, and the
+       depth of that iteration
+    '''
+    budget = SearchBudget(seconds, max_nodes)
+    moves = list(position.possible_moves())
+
+    # Index in possible_moves order -> value of the last finished iteration
+    numbers = [-float('inf')] * len(moves)
+    order = list(range(len(moves)))
+    completed = None
+
+    for depth in range(depth_limit + 1):
+        current = [-float('inf')] * len(moves)
+        searched = list()
+
+        try:
+            for index in order:
+                undo = position.make_move(*moves[index])
+
+                if undo is None:
+                    continue
+
+                try:
+                    # Depth 0 is a single static evaluation per move, so it
+                    # does not spend the budget
+                    current[index] = minimax(position, depth, table, stats, budget if depth else None)
+                finally:
+                    position.unmake_move(undo)
+
+                searched.append(index)
+
+        except BudgetExceeded:
+            # The previous best move is searched first, so its new value is
+            # known as soon as anything was searched
+            if searched and searched[0] == order[0]:
+                best = order[0]
+                top = numbers[best]
+
+                for index in searched[1:]:
+                    if current[index] > current[best]:
+                        numbers[index] = top + current[index] - current[best]
+
+            break
+
+        numbers = current
+        completed = depth
+
+        # Best moves first, keeping possible_moves order between equal values,
+        # so the first one is also the move a plain argmax would choose
+        order = sorted(range(len(moves)), key=lambda index: -numbers[index])
+
+    return list(zip(moves, numbers)), completed
+
+
+def unvisited_move(position: Game.Game, values, visited: bloom.BloomFilter):
+    '''Best valued move that was not played from position, preferring unvisited positions
+
+    Args:
+       position(Game.Game): Current position (it is left unchanged)
+       values(list): (move, value) pairs, see ::func::main.move_values()
+       visited(bloom.BloomFilter): Positions and (position, move) pairs already played
+
+    Returns:
+       tuple: First move with the highest value that leads to a position that
+       was not visited, or one that does if there is none, or None if every
+       move was already played from position
+    '''
+    best = {True: (None, -float('inf')), False: (None, -float('inf'))}
+
+    for possible_move, number in values:
+        if bloom.step_key(position.key, possible_move) in visited:
+            continue
+
+        undo = position.make_move(*possible_move)
+        if undo is None:
+            continue
+
+        fresh = position.key not in visited
+        position.unmake_move(undo)
+
+        if number > best[fresh][1]:
+            best[fresh] = (possible_move, number)
+
+    return best[True][0] if best[True][0] is not None else best[False][0]
+
+
+def depth_first(game: Game.Game, max_depth: int = 60, visited: bloom.BloomFilter = None,
+        max_nodes: int = None, tablebase: endgame_table.Tablebase = None,
+        ordering: move_ordering.MoveOrdering = None):
+    '''Depth first search for any solution, trying the best ranked moves first
+
+    Every position is entered at most once over the whole search: it is added
+    to visited when entered, and skipped if found there again. With a Bloom
+    filter the memory stays fixed no matter how long the search runs, at the
+    cost of skipping a few positions that were never actually visited.
+
+    Args:
+       game(Game.Game): Game to solve (it is not modified)
+       max_depth(int): Maximum amount of moves
+       visited(bloom.BloomFilter): Positions entered so far, a new filter by default
+       max_nodes(int): Give up after entering this many positions
+       tablebase(tablebase.Tablebase): Optional endgame table, probed at every
+        position. A hit finishes the search with its exact solution
+       ordering(ordering.MoveOrdering): Ranks the moves of every position, a
+        new one by default. Moves that raise the static evaluation are
+        reported to it
+
+    Returns:
+       list or None: (src, dest, height) moves to a won game, or None if none
+       was found
+    '''
+    if visited is None:
+        visited = bloom.BloomFilter()
+
+    if ordering is None:
+        ordering = move_ordering.MoveOrdering()
+
+    position = game.copy()
+    path = list()
+    budget = SearchBudget(max_nodes=max_nodes)
+
+    def search(depth: int) -> bool:
+        if visited.add(position.key):
+            return False
+
+        budget.spend()
+
+        if position.won():
+            return True
+
+        if tablebase is not None:
+            finish = tablebase.finish(position)
+
+            if finish is not None and depth + len(finish) <= max_depth:
+                path.extend(finish)
+                return True
+
+        if depth == max_depth:
+            return False
+
+        score = position.static_evaluation()
+
+        for possible_move in ordering.order(position, depth=depth):
+            undo = position.make_move(*possible_move)
+            if undo is None:
+                continue
+
+            if position.static_evaluation() > score:
+                ordering.improved(possible_move, depth, max_depth - depth)
+
+            path.append(possible_move)
+
+            try:
+                if search(depth + 1):
+                    return True
+            finally:
+                position.unmake_move(undo)
+
+            path.pop()
+
+        return False
+
+    try:
+        return path if search(0) else None
+
+    except BudgetExceeded:
+        return None
+
+
+def solve(game: Game.Game, depth: int = None, table: transposition.TranspositionTable = None,
+        executor: ProcessPoolExecutor = None, verbose: bool = False, stats: search_stats.SearchStats = None,
+        seconds: float = None, max_nodes: int = None, prune: bool = False,
+        cache: solution_cache.SolutionCache = None, visited: bloom.BloomFilter = None,
+        tablebase: endgame_table.Tablebase = None, budget: SearchBudget = None):
+    '''Greedily plays the move with the best minimax value until the game is won
+
+    Moves that were already played from a position are not repeated, moves
+    that go back to a visited position are avoided, and the search stops after max_steps steps even if the game was not won
+
+    Args:
+       game(Game.Game): Game to solve (it is not modified)
+       depth(int): Depth passed to minimax after every move, max_depth by default
+       table(transposition.TranspositionTable): Optional cache for the serial search
+       executor(ProcessPoolExecutor): Optional pool used to evaluate in parallel
+       verbose(bool): Print the moves and the game on each step
+       stats(stats.SearchStats): Optional counters to update
+       seconds(float): Time budget of every step. When set (or max_nodes is),
+        moves are evaluated with ::func::main.iterative_deepening() instead
+        of a fixed depth, and depth and executor are ignored
+       max_nodes(int): Node budget of every step
+       prune(bool): Use ::func::main.branch_and_bound() for the serial fixed
+        depth search
+       cache(cache.SolutionCache): Optional persistent cache. Once a position
+        with a known winning solution is reached, its moves are played instead
+        of searching, and winning solutions are stored at the end
+       visited(bloom.BloomFilter): Fixed size record of the positions and
+        (position, move) pairs already played, a new filter sized for
+        visited_positions by default. Moves into positions that were already
+        visited are only played when there is nothing else left
+       tablebase(tablebase.Tablebase): Optional endgame table, probed before
+        every step. Once a position in it is reached, its exact shortest
+        finish is played instead of searching
+       budget(SearchBudget): Optional time limit of the whole solve. No step
+        starts once it ran out, and steps searched with a time budget are
+        cut to the time left
+
+    Returns:
+       (moves, game, steps): Moves played, final game and amount of steps taken
+    '''
+    if depth is None:
+        depth = max_depth
+
+    if visited is None:
+        visited = bloom.BloomFilter(visited_positions, visited_error)
+
+    curr_game = game.copy()
+    next_game = game.copy()
+
+    if verbose:
+        print("Steps: ")
     step = 0
 
-    used_steps = set()
+    moves = list()
+
+    while not next_game.won() and step < max_steps:
+        if budget is not None and budget.expired():
+            break
 
-    while not next_game.won() and step < 29*1.5:
-        max_number = -float('inf')
         move_used = None
 
-        #  print(f'{step}', end='\r')
-        print(list(curr_game.possible_moves()))
-        #  print('[', end='')
-        for possible_move in curr_game.possible_moves():
-            position_copy = curr_game.copy()
+        cached = cache.get(curr_game) if cache is not None else None
+        if cached is not None and cached[2]:
+            for possible_move in cached[0]:
+                next_game.move(*possible_move)
+
+            moves.extend(cached[0])
+            step += len(cached[0])
+            break
+
+        finish = tablebase.finish(curr_game) if tablebase is not None else None
+        if finish is not None:
+            for possible_move in finish:
+                next_game.move(*possible_move)
+
+            moves.extend(finish)
+            step += len(finish)
+            break
+
+        if verbose:
+            print(list(curr_game.possible_moves()))
+        curr_hash = hash(curr_game)
+
+        if seconds is None and max_nodes is None:
+            values = move_values(curr_game, depth, table, executor, stats, prune)
+        else:
+            step_seconds = seconds
+            if budget is not None and budget.deadline is not None:
+                step_seconds = budget.remaining() if seconds is None else min(seconds, budget.remaining())
+
+            values, _ = iterative_deepening(curr_game, step_seconds, max_nodes, table=table, stats=stats)
 
-            if position_copy.move(*possible_move):
-                number = minimax(position_copy, max_depth)
-                #  print(str(number) + ", ", end='')
+        # First move with the highest value wins ties, even when run in parallel
+        visited.add(curr_hash)
+        move_used = unvisited_move(curr_game, values, visited)
 
-                if number > max_number and (hash(curr_game), possible_move) not in used_steps:
-                    next_game = position_copy.copy()
-                    max_number = number
-                    move_used = possible_move[:]
-        #  print(']')
+        if move_used is not None:
+            visited.add(bloom.step_key(curr_hash, move_used))
 
-        used_steps.add((hash(curr_game), move_used))
+        if move_used is not None:
+            next_game = curr_game.copy()
+            next_game.move(*move_used)
+            moves.append(move_used)
+
+        if verbose:
+            print(next_game.static_evaluation())
+            curr_game.print_stacks()
+            print()
 
-        print(next_game.static_evaluation())
-        curr_game.print_stacks()
         curr_game = next_game.copy()
         step += 1
-        print()
 
-        #  if all([(hash(curr_game), p) in used_steps for p in curr_game.possible_moves()]):
-            #  print("Ended early!")
-            #  break
+    if cache is not None and next_game.won():
+        cache.put_path(game, moves, next_game.static_evaluation(), True)
+
+    return moves, next_game, step
+
+
+def main(workers: int = None, show_stats: bool = False, seconds: float = None, prune: bool = False,
+        cache_path: str = None, visited_capacity: int = None, warm: bool = False, dfs: bool = False,
+        tablebase_path: str = None):
+    ''' Runs game from stacks.txt file and finds solution
+
+    As i'm still optimizing, I'm printing the game on each step
+
+    Args:
+       workers(int): Processes used to evaluate moves, max_workers by default
+       show_stats(bool): Print the search counters at the end
+       seconds(float): Time budget of every step, see ::func::main.solve()
+       prune(bool): Search with ::func::main.branch_and_bound()
+       cache_path(str): Persistent solution cache to use, see ::mod::cache
+       visited_capacity(int): Size the ::class::bloom.BloomFilter of visited
+        positions for this many of them, visited_positions by default
+       warm(bool): Load the cached solutions into memory before solving, see
+        ::meth::cache.SolutionCache.warm()
+       dfs(bool): Solve with ::func::main.depth_first() instead of the minimax
+        loop (the other search options are ignored)
+       tablebase_path(str): Endgame table to finish with, see ::mod::tablebase
+
+    Returns:
+       stats.SearchStats: Search counters, or None if show_stats is not set
+    '''
+    if workers is None:
+        workers = max_workers
+
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    table = transposition.TranspositionTable(table_bytes, symmetric_table)
+    stats = search_stats.SearchStats() if show_stats else None
+    cache = solution_cache.SolutionCache(cache_path) if cache_path is not None else None
+    if cache is not None and warm:
+        cache.warm()
+    visited = bloom.BloomFilter(visited_capacity or visited_positions, visited_error)
+    tablebase = endgame_table.Tablebase(tablebase_path) if tablebase_path is not None else None
+
+    base_game = Game.Game("../input/stacks.txt")
+
+    if dfs:
+        moves = depth_first(base_game, visited=visited, tablebase=tablebase)
+        final_game = base_game.copy()
+
+        for possible_move in moves or []:
+            print(possible_move)
+            final_game.move(*possible_move)
+
+        step = len(moves or [])
 
+    else:
+        moves, final_game, step = solve(base_game, max_depth, table, executor, verbose=True, stats=stats,
+                seconds=seconds, prune=prune, cache=cache, visited=visited, tablebase=tablebase)
+
+    if executor is not None:
+        executor.shutdown()
+
+    if cache is not None:
+        cache.close()
+
+    if tablebase is not None:
+        tablebase.close()
+
+    # depth_first gives up with None, solve stops after max_steps
+    if final_game.won():
+        print("We won!!! 🎉")
+    else:
+        print("No solution found")
 
-    print("We won!!! 🎉")
     print(step)
-    next_game.print_stacks()
+    final_game.print_stacks()
+
+    if stats is not None:
+        print(stats.report())
+
+    return stats
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Solves input/stacks.txt with the minimax loop")
+    parser.add_argument('-w', '--workers', type=int, default=max_workers,
+            help=f'processes used to evaluate moves (default: {max_workers})')
+    parser.add_argument('--stats', action='store_true', help='print search counters at the end')
+    parser.add_argument('-t', '--seconds', type=float,
+            help='search each step with iterative deepening for this long instead of a fixed depth')
+    parser.add_argument('--prune', action='store_true', help='skip subtrees that cannot beat the best move')
+    parser.add_argument('--cache', nargs='?', const=solution_cache.default_path,
+            help=f'reuse and store solutions in this SQLite file (default: {solution_cache.default_path})')
+    parser.add_argument('--warm', action='store_true', help='load the cached solutions into memory first')
+    parser.add_argument('--visited', type=int, metavar='CAPACITY',
+            help=f'positions the Bloom filter of visited positions is sized for (default: {visited_positions})')
+    parser.add_argument('--dfs', action='store_true',
+            help='solve with a depth first search that never enters a position twice')
+    parser.add_argument('--tablebase', nargs='?', const=endgame_table.default_path,
+            help=f'finish with this endgame table (default: {endgame_table.default_path})')
+    args = parser.parse_args()
 
+    main(args.workers, args.stats, args.seconds, args.prune, args.cache, args.visited, args.warm, args.dfs,
+            args.tablebase)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Exact solver that finds the shortest sequence of moves
+
+Unlike the minimax loop in ::func::main.main(), which greedily follows
+::meth::Game.Game.static_evaluation(), these searches are guided by a lower
+bound on the amount of moves that are still needed, so the first solution they
+find is guaranteed to be the shortest one.
+'''
+
+import heapq
+import itertools
+
+import Game
+import board
+# optimal.main() would shadow the module, so the budget classes are imported directly
+from main import BudgetExceeded, SearchBudget
+
+
+def lower_bound(game: Game.Game) -> int:
+    '''Admissible (and consistent) estimate of the moves needed to win
+
+    In a won game every block sits right on top of the next number of its own
+    color, and every tower starts with a 6. A move only ever separates the
+    bottom block of the moved run from the block under it, and that pair is
+    never consecutive (the whole consecutive run has to move). So:
+
+    * Every pair of stacked blocks that is not consecutive needs its own move
+      to be split
+    * Every stack whose bottom block is not a 6 needs its own move to take that
+      block off the floor, and that move does not split any pair
+
+    Each move can fix at most one of those problems, so their count never
+    exceeds the real amount of moves left.
+
+    Args:
+       game(Game.Game): Game to estimate
+
+    Returns:
+       int: Lower bound on the amount of moves needed to win
+    '''
+    total = 0
+
+    for stack in game.stacks:
+        upper = None
+
+        for block in stack:
+            if upper is not None and not (block.color == upper.color and block.number == upper.number + 1):
+                total += 1
+            upper = block
+
+        # upper ends up being the bottom block of the stack
+        if upper is not None and upper.number != 6:
+            total += 1
+
+    return total
+
+
+def astar(game: Game.Game, max_nodes: int = None, symmetric: bool = True, heuristic=lower_bound):
+    '''A* search for the shortest solution
+
+    Args:
+       game(Game.Game): Game to solve (it is not modified)
+       max_nodes(int): Give up after expanding this many positions
+       symmetric(bool): Merge positions that only differ by column order or
+        color names (see ::func::board.canonical())
+       heuristic(callable): Admissible and consistent estimate of the moves
+        left, ::func::optimal.lower_bound() by default
+
+    Returns:
+       list or None: Shortest list of (src, dest, height) moves, or None if
+       there is no solution (or max_nodes was reached)
+    '''
+    key = board.canonical_key if symmetric else board.encode
+
+    # Nodes are (game, moves so far, parent node, move from parent)
+    start = (game.copy(), 0, None, None)
+    best = {key(game): 0}
+
+    # Ties on f are broken by preferring deeper nodes, then insertion order
+    counter = itertools.count()
+    frontier = [(heuristic(game), 0, next(counter), start)]
+    expanded = 0
+
+    while frontier:
+        _, negative_g, _, node = heapq.heappop(frontier)
+        position, g, _, _ = node
+
+        # A shorter path to this position was found after it was queued
+        if g > best.get(key(position), g):
+            continue
+
+        if position.won():
+            moves = list()
+            while node[2] is not None:
+                moves.append(node[3])
+                node = node[2]
+
+            return moves[::-1]
+
+        expanded += 1
+        if max_nodes is not None and expanded > max_nodes:
+            return None
+
+        for possible_move in position.possible_moves():
+            child = position.copy()
+            if not child.move(*possible_move):
+                continue
+
+            child_key = key(child)
+            if child_key in best and best[child_key] <= g + 1:
+                continue
+
+            best[child_key] = g + 1
+            heapq.heappush(frontier, (
+                g + 1 + heuristic(child), -(g + 1), next(counter),
+                (child, g + 1, node, possible_move)
+                ))
+
+    return None
+
+
+def ida_star(game: Game.Game, max_bound: int = 100, max_nodes: int = None, seconds: float = None,
+        heuristic=lower_bound):
+    '''Iterative deepening A*, which only keeps the current path in memory
+
+    Each iteration is a depth first search (with in-place moves) that prunes
+    every position whose estimate goes over the current bound. The bound is
+    then raised to the smallest estimate that went over it.
+
+    Args:
+       game(Game.Game): Game to solve (it is left unchanged)
+       max_bound(int): Give up when the bound goes over this amount of moves
+       max_nodes(int): Give up after visiting this many positions, over every
+        iteration
+       seconds(float): Give up after this long
+       heuristic(callable): Admissible estimate of the moves left,
+        ::func::optimal.lower_bound() by default
+
+    Only the current path is checked for repeated positions, so on a board
+    without a solution every iteration goes through every simple path within
+    the bound. Set a budget (or use ::func::optimal.astar()) when the board
+    may not be solvable.
+
+    Returns:
+       list or None: Shortest list of (src, dest, height) moves, or None if
+       there is no solution within max_bound moves or the budget ran out
+    '''
+    position = game.copy()
+    path = list()
+    budget = SearchBudget(seconds, max_nodes)
+    # Zobrist keys of the positions in the current path, to avoid cycles
+    on_path = {position.key}
+
+    def search(g: int, bound: int):
+        '''Returns True when solved, or the smallest estimate over bound'''
+        budget.spend()
+        estimate = g + heuristic(position)
+
+        if estimate > bound:
+            return estimate
+
+        if position.won():
+            return True
+
+        smallest = float('inf')
+
+        for possible_move in list(position.possible_moves()):
+            undo = position.make_move(*possible_move)
+            if undo is None:
+                continue
+
+            if position.key not in on_path:
+                on_path.add(position.key)
+                path.append(possible_move)
+
+                result = search(g + 1, bound)
+                if result is True:
+                    return True
+
+                smallest = min(smallest, result)
+
+                path.pop()
+                on_path.discard(position.key)
+
+            position.unmake_move(undo)
+
+        return smallest
+
+    bound = heuristic(position)
+
+    while bound <= max_bound:
+        # position is a private copy, so it can be left mid-search
+        try:
+            result = search(0, bound)
+        except BudgetExceeded:
+            return None
+
+        if result is True:
+            return path
+
+        if result == float('inf'):
+            return None
+
+        bound = result
+
+    return None
+
+
+def main():
+    '''Prints the shortest solution of stacks.txt'''
+    game = Game.Game("../input/stacks.txt")
+    moves = astar(game)
+
+    if moves is None:
+        print("No solution found")
+        return
+
+    for possible_move in moves:
+        print(possible_move)
+        game.move(*possible_move)
+
+    game.print_stacks()
+    print(f"Solved in {len(moves)} moves")
+
+
+if __name__ == "__main__":
+    main()
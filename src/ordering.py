@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Move ordering shared by the searches that expand ::meth::Game.Game.possible_moves()
+
+::meth::Game.Game.possible_moves() yields moves in src, dest index order,
+which says nothing about how good they are. Pruned searches cut more, and
+searches with a budget find better answers, when good moves are tried first,
+so ::class::MoveOrdering ranks them with
+
+- killer moves: the last moves that were best at the same depth, in sibling
+  positions, are tried first
+- the static evaluation after the move (::meth::Game.Game.evaluate_move()),
+  plus cheap hints: the move continues a consecutive run, or empties its
+  source column
+- a history table of the (src, dest) pairs that improved the score before,
+  weighted by the depth they did it at, to break the remaining ties
+
+The searches report good moves back with ::meth::MoveOrdering.improved().
+'''
+
+import Game
+
+
+# Bonus added to the static evaluation by the hints
+run_bonus = 8
+free_bonus = 4
+
+
+class MoveOrdering:
+    '''Ranks moves before a search expands them
+
+    Attributes:
+       history(dict): (src, dest) -> sum of the squared depths at which it
+        improved the score
+       killers(dict): Depth -> last moves that improved the score at that
+        depth, most recent first
+       killer_slots(int): Killer moves kept per depth
+    '''
+    __slots__ = ['history', 'killers', 'killer_slots']
+
+    def __init__(self, killer_slots: int = 2):
+        '''Starts with no history
+
+        Args:
+           killer_slots(int): Killer moves kept per depth
+        '''
+        self.history = dict()
+        self.killers = dict()
+        self.killer_slots = killer_slots
+
+    def hints(self, position: Game.Game, possible_move) -> int:
+        '''Static bonus of a move, see run_bonus and free_bonus
+
+        Args:
+           position(Game.Game): Position the move is played from
+           possible_move(tuple): (src, dest, height) move
+
+        Returns:
+           int: Bonus to add to the static evaluation of the move
+        '''
+        src, dest, height = possible_move
+        bonus = 0
+
+        destination = position.stacks[dest]
+        if destination.height:
+            bottom = position.stacks[src].head.next.base
+
+            # The moved run and the one under it become a single run
+            if destination.head.next.value.number == bottom.number + 1:
+                bonus += run_bonus
+
+            if height == position.stacks[src].height:
+                bonus += free_bonus
+
+        return bonus
+
+    def score(self, position: Game.Game, possible_move, depth: int = 0) -> tuple:
+        '''Sort key of a move, higher is tried first
+
+        Args:
+           position(Game.Game): Position the move is played from
+           possible_move(tuple): (src, dest, height) move
+           depth(int): Depth (or remaining depth) of position in the search, for
+            the killer moves
+
+        Returns:
+           tuple: (killer, static evaluation plus hints, history)
+        '''
+        killers = self.killers.get(depth, ())
+        killer = len(killers) - killers.index(possible_move) if possible_move in killers else 0
+
+        return (
+                killer,
+                position.evaluate_move(*possible_move) + self.hints(position, possible_move),
+                self.history.get(possible_move[:2], 0),
+                )
+
+    def order(self, position: Game.Game, moves=None, depth: int = 0) -> list:
+        '''Moves of a position, best first
+
+        Args:
+           position(Game.Game): Position to order the moves of
+           moves(list): Moves to order, every possible move by default
+           depth(int): Depth (or remaining depth) of position in the search, for
+            the killer moves
+
+        Returns:
+           list: (src, dest, height) moves, keeping the
+           ::meth::Game.Game.possible_moves() order between equal ones
+        '''
+        if moves is None:
+            moves = position.possible_moves()
+
+        scored = [(self.score(position, possible_move, depth), possible_move) for possible_move in moves]
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+
+        # sort is stable, and reverse keeps equal keys in their original order
+        return [possible_move for _, possible_move in scored]
+
+    def improved(self, possible_move, depth: int = 0, weight: int = 1):
+        '''Records a move that improved the score
+
+        Args:
+           possible_move(tuple): (src, dest, height) move
+           depth(int): Depth it was played from, for the killer moves
+           weight(int): Remaining search depth under the move, deeper
+            improvements weigh more in the history
+        '''
+        pair = possible_move[:2]
+        self.history[pair] = self.history.get(pair, 0) + weight * weight
+
+        killers = self.killers.setdefault(depth, [])
+        if possible_move in killers:
+            killers.remove(possible_move)
+
+        killers.insert(0, possible_move)
+        del killers[self.killer_slots:]
+
+    def clear(self):
+        '''Forgets the history and the killer moves'''
+        self.history.clear()
+        self.killers.clear()
@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Long running local solver service
+
+Serves JSON over HTTP/1.1, on a TCP port or a Unix socket, with an asyncio
+front end and a pool of worker processes that keep their transposition
+table, solution cache and endgame table between requests, so a puzzle costs
+a search instead of a new interpreter.
+
+Endpoints:
+
+- ``POST /solve``: the body is the puzzle, in the
+  ::meth::Game.Game.parse_from_file() format, either as plain text or as a
+  JSON object ``{"board": ..., "deadline": ..., "seconds": ...}``. deadline
+  is how long the client waits for the answer, and seconds the time budget
+  of every step of ::func::main.solve(). Identical puzzles that are being
+  solved at the same time share a single solve
+- ``GET /health``: counters of the service
+
+Example:
+   python server.py --port 8080 --workers 4
+   curl -s --data-binary @../input/stacks.txt localhost:8080/solve
+'''
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import batch
+import board
+import cache as solution_cache
+import main
+import tablebase as endgame_table
+import transposition
+
+
+# Largest request body accepted
+max_body = 2**16
+
+# Seconds a running solve may stop before the deadline of a request that joins it
+coalesce_slack = 1.0
+
+reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+        413: 'Payload Too Large', 500: 'Internal Server Error', 504: 'Gateway Timeout'}
+
+# Search state of the current worker process, kept between requests
+worker_table = None
+worker_tablebases = dict()
+
+
+def solve_packed(packed: bytes, depth: int, seconds: float = None, cache_path: str = None,
+        warm: bool = False, tablebase_path: str = None, stop_at: float = None) -> dict:
+    '''Solves a packed board, meant to run in a worker process
+
+    Args:
+       packed(bytes): Puzzle, see ::func::board.encode()
+       depth(int): Depth passed to minimax after every move
+       seconds(float): Time budget of every step, see ::func::main.solve()
+       cache_path(str): Persistent solution cache, see ::mod::cache
+       warm(bool): Load the cached solutions into memory the first time the
+        cache is opened by this process
+       tablebase_path(str): Endgame table to finish with, see ::mod::tablebase
+       stop_at(float): time.time() value after which the search stops, see
+        the budget of ::func::main.solve()
+
+    Returns:
+       dict: JSON-ready result with the moves, step count, final score,
+       whether the game was won and the time spent solving
+    '''
+    global worker_table
+
+    start = time.perf_counter()
+
+    if worker_table is None:
+        worker_table = transposition.TranspositionTable(main.table_bytes, main.symmetric_table)
+
+    cache = batch.worker_cache(cache_path, warm) if cache_path is not None else None
+
+    tablebase = None
+    if tablebase_path is not None:
+        if tablebase_path not in worker_tablebases:
+            worker_tablebases[tablebase_path] = endgame_table.Tablebase(tablebase_path)
+        tablebase = worker_tablebases[tablebase_path]
+
+    # Wall clock time, since it was set by another process
+    budget = main.SearchBudget(max(0.0, stop_at - time.time())) if stop_at is not None else None
+
+    try:
+        moves, final_game, steps = main.solve(board.decode(packed), depth, worker_table, seconds=seconds,
+                cache=cache, tablebase=tablebase, budget=budget)
+    finally:
+        if cache is not None:
+            cache.flush()
+
+    return {
+            'moves': [list(possible_move) for possible_move in moves],
+            'steps': steps,
+            'score': final_game.static_evaluation(),
+            'won': final_game.won(),
+            'solve_seconds': round(time.perf_counter() - start, 6),
+            }
+
+
+class HTTPError(Exception):
+    '''Error answered to the client with an HTTP status'''
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Solve:
+    '''A solve sent to the worker processes, shared by identical requests
+
+    Attributes:
+       future(asyncio.Future): Result of ::func::server.solve_packed()
+       stop_at(float): time.time() value after which the worker stops searching
+       waiters(int): Requests still waiting for the result
+    '''
+    __slots__ = ['future', 'stop_at', 'waiters']
+
+    def __init__(self, future: asyncio.Future, stop_at: float):
+        self.future = future
+        self.stop_at = stop_at
+        self.waiters = 0
+
+
+class SolverService:
+    '''Solves puzzles received over HTTP in a process pool
+
+    Attributes:
+       executor(ProcessPoolExecutor): Worker processes
+       workers(int): Amount of worker processes
+       depth(int): Depth passed to minimax after every move
+       deadline(float): Seconds a client waits for its answer by default
+       cache_path(str): Solution cache of the workers
+       warm(bool): Load the cached solutions into memory in every worker
+       tablebase_path(str): Endgame table of the workers
+       in_flight(dict): (packed board, seconds) -> ::class::server.Solve
+        that new requests of that puzzle can join
+       counters(dict): Amount of requests, solves started, solves completed,
+        coalesced requests, timeouts and errors
+       solve_seconds(float): Total time spent by the completed solves
+       started(float): Start time, for the uptime
+    '''
+
+    def __init__(self, workers: int = 1, depth: int = None, deadline: float = 60.0, cache_path: str = None,
+            warm: bool = False, tablebase_path: str = None):
+        '''Starts the worker processes
+
+        Args:
+           workers(int): Amount of worker processes
+           depth(int): Depth passed to minimax after every move, main.max_depth by default
+           deadline(float): Seconds a client waits for its answer, unless the
+            request sets its own
+           cache_path(str): Persistent solution cache shared by the workers
+           warm(bool): Load the cached solutions into memory in every worker
+           tablebase_path(str): Endgame table the workers finish with
+        '''
+        # Spawned, so workers started after the server binds do not inherit
+        # (and keep open) its listening socket
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self.workers = workers
+        self.depth = main.max_depth if depth is None else depth
+        self.deadline = deadline
+        self.cache_path = cache_path
+        self.warm = warm
+        self.tablebase_path = tablebase_path
+
+        self.in_flight = dict()
+        self.counters = {'requests': 0, 'solves': 0, 'completed': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0}
+        self.solve_seconds = 0.0
+        self.started = time.monotonic()
+
+    def health(self) -> dict:
+        '''Counters of the service, answered by GET /health'''
+        completed = self.counters['completed']
+
+        return {
+                'status': 'ok',
+                'uptime': round(time.monotonic() - self.started, 3),
+                'workers': self.workers,
+                'in_flight': len(self.in_flight),
+                **self.counters,
+                'mean_solve_seconds': round(self.solve_seconds / completed, 6) if completed else None,
+                }
+
+    def finished(self, key, running: Solve):
+        '''Forgets a finished solve, recording its time if it completed'''
+        if self.in_flight.get(key) is running:
+            del self.in_flight[key]
+
+        future = running.future
+        if not future.cancelled() and future.exception() is None:
+            self.counters['completed'] += 1
+            self.solve_seconds += future.result()['solve_seconds']
+
+    def abandon(self, key, running: Solve):
+        '''Gives up on a solve nobody waits for anymore
+
+        A solve still queued is cancelled. One already running cannot be
+        interrupted from here, but its stop_at is at most coalesce_slack
+        seconds after the deadline of the last waiter, which just passed, so
+        the worker stops shortly after
+        '''
+        if self.in_flight.get(key) is running:
+            del self.in_flight[key]
+
+        running.future.cancel()
+
+    async def solve(self, text: str, deadline: float = None, seconds: float = None) -> dict:
+        '''Solves a puzzle, or joins the solve of the same puzzle already running
+
+        The deadline also stops the search in the worker. A request only
+        joins a solve that stops at most coalesce_slack seconds before its
+        own deadline, otherwise it starts a new one. A client that runs out of time gets an error
+        while the solve goes on for the other clients waiting on it, and a
+        solve that nobody waits for anymore is abandoned
+
+        Args:
+           text(str): Puzzle in the ::meth::Game.Game.parse_from_file() format
+           deadline(float): Seconds to wait for the answer, the service deadline by default
+           seconds(float): Time budget of every step, see ::func::main.solve()
+
+        Returns:
+           dict: Result of ::func::server.solve_packed(), plus whether it was
+           shared with another request
+
+        Raises:
+           HTTPError: If the puzzle is invalid or the deadline is reached
+        '''
+        try:
+            packed = board.from_file_text(text)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        if not packed.replace(bytes([board.SEPARATOR]), b''):
+            raise HTTPError(400, "Expected the board to have blocks")
+
+        if deadline is None:
+            deadline = self.deadline
+
+        key = (packed, seconds)
+        stop_at = time.time() + deadline
+        running = self.in_flight.get(key)
+
+        # A solve that stops much earlier would give a worse answer than this
+        # request has time for
+        coalesced = running is not None and running.stop_at >= stop_at - coalesce_slack
+
+        if coalesced:
+            self.counters['coalesced'] += 1
+        else:
+            self.counters['solves'] += 1
+            future = asyncio.get_running_loop().run_in_executor(self.executor, solve_packed, packed, self.depth,
+                    seconds, self.cache_path, self.warm, self.tablebase_path, stop_at)
+            running = Solve(future, stop_at)
+            future.add_done_callback(lambda done, running=running: self.finished(key, running))
+            self.in_flight[key] = running
+
+        running.waiters += 1
+
+        try:
+            # Shielded, so a client giving up does not cancel the others
+            result = await asyncio.wait_for(asyncio.shield(running.future), deadline)
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            running.waiters -= 1
+
+            if not running.waiters:
+                self.abandon(key, running)
+
+            raise HTTPError(504, f"No solution within {deadline} seconds")
+
+        running.waiters -= 1
+
+        return {**result, 'coalesced': coalesced}
+
+    async def route(self, method: str, path: str, body: bytes):
+        '''Answers a request
+
+        Returns:
+           (status, dict): HTTP status and JSON body
+        '''
+        if path == '/health':
+            if method != 'GET':
+                raise HTTPError(405, f"Expected GET {path}")
+            return 200, self.health()
+
+        if path != '/solve':
+            raise HTTPError(404, f"Unknown path {path}")
+
+        if method != 'POST':
+            raise HTTPError(405, f"Expected POST {path}")
+
+        text = body.decode('utf-8', errors='replace')
+        if not text.lstrip().startswith('{'):
+            return 200, await self.solve(text)
+
+        try:
+            options = json.loads(text)
+            text = str(options['board'])
+            deadline, seconds = [None if options.get(name) is None else float(options[name])
+                    for name in ('deadline', 'seconds')]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'Expected a JSON object with a "board" string and numeric "deadline" and "seconds"')
+
+        return 200, await self.solve(text, deadline, seconds)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        '''Serves the requests of a connection, keeping it alive between them'''
+        try:
+            while True:
+                request = await reader.readline()
+                if not request.strip():
+                    break
+
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                self.counters['requests'] += 1
+                version = 'HTTP/1.1'
+
+                try:
+                    method, path, version = request.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+
+                    if length > max_body:
+                        raise HTTPError(413, f"Expected at most {max_body} bytes")
+
+                    body = await reader.readexactly(length)
+                    status, answer = await self.route(method, path.split('?')[0], body)
+
+                except HTTPError as e:
+                    status, answer = e.status, {'error': str(e)}
+                    if e.status != 504:
+                        self.counters['errors'] += 1
+
+                except ValueError as e:
+                    status, answer = 400, {'error': f"Malformed request: {e}"}
+                    self.counters['errors'] += 1
+
+                except asyncio.IncompleteReadError:
+                    break
+
+                except Exception as e:
+                    status, answer = 500, {'error': f"{type(e).__name__}: {e}"}
+                    self.counters['errors'] += 1
+
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                payload = json.dumps(answer).encode('utf-8')
+
+                writer.write(
+                        f"HTTP/1.1 {status} {reasons[status]}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode('latin-1') + payload
+                        )
+                await writer.drain()
+
+                if close:
+                    break
+
+        except ConnectionError:
+            pass
+
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8080, unix_path: str = None):
+        '''Accepts connections until cancelled (which SIGTERM does too)
+
+        Args:
+           host(str): Address to listen on
+           port(int): TCP port to listen on
+           unix_path(str): Listen on this Unix socket instead of TCP
+        '''
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        '''Stops the worker processes'''
+        self.executor.shutdown(cancel_futures=True)
+
+
+def cli(argv=None) -> int:
+    '''Command line entry point
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+
+    Returns:
+       int: Exit status
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=8080, help='TCP port to listen on (default: 8080)')
+    parser.add_argument('--unix', metavar='PATH', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+            help='amount of worker processes (default: one per CPU)')
+    parser.add_argument('-d', '--depth', type=int, default=main.max_depth,
+            help=f'minimax depth after every move (default: {main.max_depth})')
+    parser.add_argument('--deadline', type=float, default=60.0,
+            help='seconds a client waits for its answer, unless it sets its own (default: 60)')
+    parser.add_argument('--cache', nargs='?', const=solution_cache.default_path,
+            help=f'reuse and store solutions in this SQLite file (default: {solution_cache.default_path})')
+    parser.add_argument('--warm', action='store_true', help='load the cached solutions into memory first')
+    parser.add_argument('--tablebase', nargs='?', const=endgame_table.default_path,
+            help=f'finish with this endgame table (default: {endgame_table.default_path})')
+    args = parser.parse_args(argv)
+
+    service = SolverService(args.workers, args.depth, args.deadline, args.cache, args.warm, args.tablebase)
+    print(f"Listening on {args.unix or f'{args.host}:{args.port}'}")
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        service.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
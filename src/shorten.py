@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Post-processing that makes a solution shorter
+
+The greedy loop in ::func::main.solve() is fast but can wander: it may come
+back to a position it already visited, or take several moves to reach a board
+that was a couple of moves away. This module takes its result and
+
+* removes the cycles, cutting the moves between two visits of the same board
+* looks for shortcuts, running a small search of a few moves around every
+  position and jumping ahead whenever it reaches a later position of the path
+
+Both passes only ever splice the path between two of its own positions, so the
+final board is exactly the same, with fewer moves to get there.
+'''
+
+import argparse
+import sys
+import time
+
+import Game
+import board
+import main
+import transposition
+
+
+def positions(game: Game.Game, moves) -> list:
+    '''Zobrist keys of every position of a path (see ::attr::Game.Game.key)
+
+    Args:
+       game(Game.Game): Starting position (it is not modified)
+       moves(list): (src, dest, height) moves
+
+    Returns:
+       list[int]: len(moves) + 1 keys, starting with the one of game
+    '''
+    position = game.copy()
+    keys = [position.key]
+
+    for possible_move in moves:
+        position.move(*possible_move)
+        keys.append(position.key)
+
+    return keys
+
+
+def remove_cycles(game: Game.Game, moves) -> list:
+    '''Drops the moves between two visits of the same position
+
+    Args:
+       game(Game.Game): Starting position (it is not modified)
+       moves(list): (src, dest, height) moves
+
+    Returns:
+       list: Moves without cycles, ending at the same position
+    '''
+    keys = positions(game, moves)
+
+    # Key -> index in the result of the position it leads to
+    visited = {keys[0]: 0}
+    result = list()
+
+    for possible_move, key in zip(moves, keys[1:]):
+        if key in visited:
+            # Back to an earlier position: forget everything played since
+            del result[visited[key]:]
+
+            for dropped in [k for k, index in visited.items() if index > len(result)]:
+                del visited[dropped]
+
+        else:
+            result.append(possible_move)
+            visited[key] = len(result)
+
+    return result
+
+
+def find_shortcut(position: Game.Game, start: int, targets: dict, radius: int, budget: main.SearchBudget = None):
+    '''Searches every sequence of up to radius moves for a later position of the path
+
+    Args:
+       position(Game.Game): Position start of the path (it is searched in place
+        and restored before returning)
+       start(int): Index of position in the path
+       targets(dict): Zobrist key -> index of the positions of the path
+       radius(int): Maximum length of the shortcut
+       budget(main.SearchBudget): Optional limits, checked on every position
+
+    Returns:
+       (end, moves): Index of the position reached and the moves to reach it,
+       with the biggest saving, or None if no shortcut saves a move
+
+    Raises:
+       main.BudgetExceeded: If the budget runs out
+    '''
+    # Key -> fewest moves needed to reach it, so transpositions are only
+    # searched again when they are reached sooner
+    seen = dict()
+    path = list()
+    best = [0, None]
+
+    def search(depth: int):
+        key = position.key
+        if seen.get(key, radius + 1) <= depth:
+            return
+        seen[key] = depth
+
+        if budget is not None:
+            budget.spend()
+
+        end = targets.get(key)
+        if end is not None and end - start - depth > best[0]:
+            best[0] = end - start - depth
+            best[1] = (end, list(path))
+
+        if depth == radius or position.won():
+            return
+
+        for possible_move in position.possible_moves():
+            undo = position.make_move(*possible_move)
+
+            if undo is not None:
+                path.append(possible_move)
+
+                try:
+                    search(depth + 1)
+                finally:
+                    path.pop()
+                    position.unmake_move(undo)
+
+    search(0)
+
+    return best[1]
+
+
+def shortcut(game: Game.Game, moves, radius: int = 3, seconds: float = 1.0, max_nodes: int = None) -> list:
+    '''Replaces stretches of a path with shorter ones found by ::func::shorten.find_shortcut()
+
+    Positions are visited from the start of the path. After a shortcut is
+    taken the search continues from the position it leads to, so one pass is
+    enough to reach every remaining position.
+
+    Args:
+       game(Game.Game): Starting position (it is not modified)
+       moves(list): (src, dest, height) moves
+       radius(int): Maximum length of every shortcut
+       seconds(float): Wall clock budget of the whole pass, or None for no limit
+       max_nodes(int): Node budget of the whole pass, or None for no limit
+
+    Returns:
+       list: Moves ending at the same position, never more than before
+    '''
+    budget = main.SearchBudget(seconds, max_nodes)
+
+    moves = list(moves)
+    position = game.copy()
+    result = list()
+
+    keys = positions(game, moves)
+    targets = {key: index for index, key in enumerate(keys)}
+    index = 0
+
+    try:
+        while index < len(moves):
+            found = find_shortcut(position, index, targets, radius, budget)
+
+            if found is not None:
+                end, steps = found
+
+                # Keys are 64 bit hashes, so the board reached is double checked
+                # before the path is spliced
+                target = position.copy()
+                for possible_move in moves[index:end]:
+                    target.move(*possible_move)
+
+                candidate = position.copy()
+                for possible_move in steps:
+                    candidate.move(*possible_move)
+
+                if board.encode(candidate) == board.encode(target):
+                    result.extend(steps)
+                    position = candidate
+                    index = end
+                    continue
+
+            position.move(*moves[index])
+            result.append(moves[index])
+            index += 1
+
+    except main.BudgetExceeded:
+        result.extend(moves[index:])
+
+    return result
+
+
+def shorten(game: Game.Game, moves, radius: int = 3, seconds: float = 1.0, max_nodes: int = None) -> list:
+    '''Removes the cycles of a path and then the detours
+
+    Args:
+       game(Game.Game): Starting position (it is not modified)
+       moves(list): (src, dest, height) moves
+       radius(int): Maximum length of every shortcut
+       seconds(float): Wall clock budget of the shortcut search, or None for no limit
+       max_nodes(int): Node budget of the shortcut search, or None for no limit
+
+    Returns:
+       list: Moves ending at the same position, never more than before
+    '''
+    return shortcut(game, remove_cycles(game, moves), radius, seconds, max_nodes)
+
+
+def cli(argv=None) -> int:
+    '''Solves a puzzle with ::func::main.solve() and prints the shortened solution
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+
+    Returns:
+       int: Exit status
+    '''
+    parser = argparse.ArgumentParser(description="Solves a puzzle greedily and shortens the solution")
+    parser.add_argument('puzzle', nargs='?', default="../input/stacks.txt", help='puzzle file')
+    parser.add_argument('-r', '--radius', type=int, default=3, help='maximum length of a shortcut (default: 3)')
+    parser.add_argument('-t', '--seconds', type=float, default=1.0,
+            help='time budget of the shortcut search (default: 1)')
+    args = parser.parse_args(argv)
+
+    game = Game.Game(args.puzzle)
+    table = transposition.TranspositionTable(main.table_bytes, main.symmetric_table)
+    moves, final_game, _ = main.solve(game, main.max_depth, table)
+
+    start = time.perf_counter()
+    shortened = shorten(game, moves, args.radius, args.seconds)
+
+    for possible_move in shortened:
+        print(possible_move)
+
+    final_game.print_stacks()
+    print(f"{len(moves)} moves shortened to {len(shortened)} in {time.perf_counter() - start:.3f} seconds")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
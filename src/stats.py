@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Counters collected while searching
+
+Searches take an optional ``stats`` argument. When it is None (the default)
+nothing is recorded, so leaving the parameter in production code costs only a
+few comparisons per node.
+'''
+
+
+class SearchStats:
+    '''Counters of a search, grouped by remaining depth where it makes sense
+
+    Attributes:
+       nodes(int): Positions whose moves were generated
+       leaves(int): Positions scored with ::meth::Game.Game.static_evaluation()
+       moves_generated(int): Moves returned by ::meth::Game.Game.possible_moves()
+       moves_rejected(int): Generated moves that ::meth::Game.Game.is_valid_move() refused
+       table_hits(int): Transposition table probes that returned a value
+       table_misses(int): Transposition table probes that did not
+       pruned(int): Subtrees skipped by a bound
+       depth_nodes(dict): Remaining depth -> positions visited (nodes and leaves)
+       depth_time(dict): Remaining depth -> seconds spent in those positions,
+        including everything searched below them
+    '''
+    __slots__ = ['nodes', 'leaves', 'moves_generated', 'moves_rejected',
+            'table_hits', 'table_misses', 'pruned', 'depth_nodes', 'depth_time']
+
+    def __init__(self):
+        self.nodes = 0
+        self.leaves = 0
+        self.moves_generated = 0
+        self.moves_rejected = 0
+        self.table_hits = 0
+        self.table_misses = 0
+        self.pruned = 0
+        self.depth_nodes = dict()
+        self.depth_time = dict()
+
+    def add_leaf(self, depth: int, seconds: float):
+        '''Records a position that was scored instead of expanded
+
+        Args:
+           depth(int): Remaining depth of the position
+           seconds(float): Time spent on it
+        '''
+        self.leaves += 1
+        self.depth_nodes[depth] = self.depth_nodes.get(depth, 0) + 1
+        self.depth_time[depth] = self.depth_time.get(depth, 0.0) + seconds
+
+    def add_node(self, depth: int, generated: int, rejected: int, seconds: float):
+        '''Records a position whose moves were searched
+
+        Args:
+           depth(int): Remaining depth of the position
+           generated(int): Moves generated from it
+           rejected(int): Generated moves that turned out to be invalid
+           seconds(float): Time spent on it, including its children
+        '''
+        self.nodes += 1
+        self.moves_generated += generated
+        self.moves_rejected += rejected
+        self.depth_nodes[depth] = self.depth_nodes.get(depth, 0) + 1
+        self.depth_time[depth] = self.depth_time.get(depth, 0.0) + seconds
+
+    def add_probe(self, hit: bool):
+        '''Records a transposition table lookup
+
+        Args:
+           hit(bool): True if the table had a usable value
+        '''
+        if hit:
+            self.table_hits += 1
+        else:
+            self.table_misses += 1
+
+    def merge(self, other):
+        '''Adds the counters of another instance (e.g. from a worker process)
+
+        Args:
+           other(SearchStats): Counters to add
+        '''
+        self.nodes += other.nodes
+        self.leaves += other.leaves
+        self.moves_generated += other.moves_generated
+        self.moves_rejected += other.moves_rejected
+        self.table_hits += other.table_hits
+        self.table_misses += other.table_misses
+        self.pruned += other.pruned
+
+        for depth, count in other.depth_nodes.items():
+            self.depth_nodes[depth] = self.depth_nodes.get(depth, 0) + count
+
+        for depth, seconds in other.depth_time.items():
+            self.depth_time[depth] = self.depth_time.get(depth, 0.0) + seconds
+
+    def branching_factor(self) -> float:
+        '''Average amount of valid moves per expanded position'''
+        if self.nodes == 0:
+            return 0.0
+
+        return (self.moves_generated - self.moves_rejected) / self.nodes
+
+    def hit_rate(self) -> float:
+        '''Fraction of transposition table probes that returned a value'''
+        probes = self.table_hits + self.table_misses
+
+        if probes == 0:
+            return 0.0
+
+        return self.table_hits / probes
+
+    def as_dict(self) -> dict:
+        '''JSON-ready copy of every counter
+
+        Returns:
+           dict: Counters plus the branching factor and the table hit rate
+        '''
+        return {
+                'nodes': self.nodes,
+                'leaves': self.leaves,
+                'moves_generated': self.moves_generated,
+                'moves_rejected': self.moves_rejected,
+                'branching_factor': self.branching_factor(),
+                'table_hits': self.table_hits,
+                'table_misses': self.table_misses,
+                'hit_rate': self.hit_rate(),
+                'pruned': self.pruned,
+                'depth_nodes': {str(depth): count for depth, count in sorted(self.depth_nodes.items())},
+                'depth_time': {str(depth): seconds for depth, seconds in sorted(self.depth_time.items())},
+                }
+
+    def report(self) -> str:
+        '''Human readable summary
+
+        Returns:
+           str: Multi-line report
+        '''
+        lines = [
+                f"Nodes expanded:   {self.nodes:,}",
+                f"Leaves evaluated: {self.leaves:,}",
+                f"Moves generated:  {self.moves_generated:,} ({self.moves_rejected:,} rejected)",
+                f"Branching factor: {self.branching_factor():.2f}",
+                ]
+
+        if self.table_hits or self.table_misses:
+            lines.append(f"Table hits:       {self.table_hits:,} / {self.table_hits + self.table_misses:,} ({self.hit_rate():.1%})")
+
+        if self.pruned:
+            lines.append(f"Pruned subtrees:  {self.pruned:,}")
+
+        lines.append("Depth    Positions     Seconds")
+        for depth in sorted(self.depth_nodes, reverse=True):
+            lines.append(f"{depth:5} {self.depth_nodes[depth]:12,} {self.depth_time.get(depth, 0.0):11.4f}")
+
+        return '\n'.join(lines)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Endgame tablebase: exact distance to win of every position close to a won board
+
+The table is built by retrograde analysis: a breadth first search over the
+reverse moves (::func::bidirectional.reverse_moves()) starting at the won
+board, so every position is first reached at its exact distance to a win.
+Boards are stored reduced by ::func::board.canonical(), since permuting
+columns or renaming colors changes neither the moves nor the distance, so one
+table serves every puzzle with the same amount of blocks and columns.
+
+The file holds sorted fixed width records (canonical board, then one byte of
+distance) after a short header, and is memory-mapped, so a probe is a binary
+search over shared pages. ::func::main.solve() and ::func::main.depth_first()
+probe it at every node and, on a hit, play the exact finish instead of
+searching.
+
+Example:
+   python tablebase.py --build --depth 3
+'''
+
+import argparse
+import mmap
+import os.path
+import sys
+
+import Game
+import bidirectional
+import board
+
+
+root_dir = os.path.normpath(os.path.join(os.path.abspath(os.path.dirname(__file__)), '..'))
+default_path = os.path.join(root_dir, 'endgame.tb')
+
+magic = b'SIXTOWERS-TB-1\n'
+# After the magic: depth of the table and length of its boards
+header_size = len(magic) + 2
+
+
+def retrograde(game: Game.Game, depth: int) -> dict:
+    '''Every position at most depth moves away from winning
+
+    Args:
+       game(Game.Game): Any position with the blocks and columns of the table
+       depth(int): Largest distance to win to keep (at most 255)
+
+    Returns:
+       dict: Canonical board -> exact amount of moves to win
+
+    Raises:
+       ValueError: If the blocks of game cannot form a won board
+    '''
+    goal = bidirectional.goal_columns(game)
+
+    if goal is None:
+        raise ValueError("Expected the blocks of the game to form a 6 to 0 tower per color")
+
+    start = board.canonical(board.join(goal))
+    distance = {start: 0}
+    layer = [start]
+
+    for moves in range(1, depth + 1):
+        next_layer = list()
+
+        for packed in layer:
+            for _, before in bidirectional.reverse_moves(board.columns(packed)):
+                key = board.canonical(board.join(before))
+
+                if key not in distance:
+                    distance[key] = moves
+                    next_layer.append(key)
+
+        layer = next_layer
+
+    return distance
+
+
+def build(game: Game.Game, depth: int = 3, path: str = default_path) -> int:
+    '''Generates the table and writes it atomically
+
+    Args:
+       game(Game.Game): Any position with the blocks and columns of the table
+       depth(int): Largest distance to win stored
+       path(str): File to write
+
+    Returns:
+       int: Amount of positions written
+    '''
+    distance = retrograde(game, depth)
+    size = len(board.encode(game))
+
+    with open(path + '.tmp', 'wb') as fp:
+        fp.write(magic + bytes([depth, size]))
+
+        for packed in sorted(distance):
+            fp.write(packed + bytes([distance[packed]]))
+
+    os.replace(path + '.tmp', path)
+
+    return len(distance)
+
+
+class Tablebase:
+    '''Memory-mapped endgame table
+
+    Attributes:
+       path(str): Table file
+       table(mmap.mmap): Read only view of the file
+       depth(int): Largest distance to win stored
+       board_size(int): Length of the packed boards of the table
+       count(int): Amount of positions stored
+    '''
+
+    def __init__(self, path: str = default_path):
+        '''Maps a table written by ::func::tablebase.build()
+
+        Args:
+           path(str): Table file
+
+        Raises:
+           ValueError: If the file is not an endgame table
+        '''
+        self.path = path
+
+        with open(path, 'rb') as fp:
+            self.table = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.table[:len(magic)] != magic:
+            self.table.close()
+            raise ValueError(f"Expected {path} to be an endgame table")
+
+        self.depth = self.table[len(magic)]
+        self.board_size = self.table[len(magic) + 1]
+        self.count = (len(self.table) - header_size) // (self.board_size + 1)
+
+    def close(self):
+        '''Unmaps the file'''
+        self.table.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def probe(self, game: Game.Game) -> int:
+        '''Exact amount of moves needed to win, if the position is in the table
+
+        Args:
+           game(Game.Game): Position to look up
+
+        Returns:
+           int: Distance to win, or None if the position is further than
+           ::attr::Tablebase.depth moves from winning (or has another shape)
+        '''
+        packed = board.encode(game)
+
+        if len(packed) != self.board_size:
+            return None
+
+        key = board.canonical(packed)
+        table = self.table
+        record = self.board_size + 1
+        low = 0
+        high = self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            start = header_size + middle * record
+            found = table[start:start + self.board_size]
+
+            if found == key:
+                return table[start + self.board_size]
+
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def finish(self, game: Game.Game) -> list:
+        '''Shortest solution of a position in the table
+
+        Every step plays a move whose position is one move closer to winning
+
+        Args:
+           game(Game.Game): Position to solve (it is not modified)
+
+        Returns:
+           list or None: (src, dest, height) moves to a won game, or None if
+           the position is not in the table (or the table was built for
+           other blocks, and no move gets closer to winning)
+        '''
+        distance = self.probe(game)
+        if distance is None:
+            return None
+
+        position = game.copy()
+        moves = list()
+
+        while distance:
+            for possible_move in position.possible_moves():
+                undo = position.make_move(*possible_move)
+                if undo is None:
+                    continue
+
+                if self.probe(position) == distance - 1:
+                    moves.append(possible_move)
+                    distance -= 1
+                    break
+
+                position.unmake_move(undo)
+
+            else:
+                # Only a table built for other blocks has no move closer to
+                # winning, and then the game is treated as not in the table
+                return None
+
+        return moves
+
+
+def cli(argv=None) -> int:
+    '''Command line entry point
+
+    Args:
+       argv(list[str]): Arguments, sys.argv[1:] by default
+
+    Returns:
+       int: Exit status
+    '''
+    parser = argparse.ArgumentParser(description="Builds the endgame tablebase or probes a puzzle in it")
+    parser.add_argument('puzzle', nargs='?', default="../input/stacks.txt",
+            help='puzzle file, whose blocks and columns the table is built for')
+    parser.add_argument('--path', default=default_path, help=f'table file (default: {default_path})')
+    parser.add_argument('--build', action='store_true', help='(re)build the table and exit')
+    parser.add_argument('-d', '--depth', type=int, default=3, help='largest distance to win stored (default: 3)')
+    args = parser.parse_args(argv)
+
+    game = Game.Game(args.puzzle)
+
+    if args.build:
+        print(f"{build(game, args.depth, args.path):,} positions written to {args.path}")
+        return 0
+
+    table = Tablebase(args.path)
+    moves = table.finish(game)
+
+    if moves is None:
+        print(f"More than {table.depth} moves from winning")
+        return 1
+
+    print(f"Solved in {len(moves)} moves: {moves}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Transposition table for the minimax search
+
+Different move orders often reach the same board, so the values found for a
+position can be reused the next time the search reaches it.
+'''
+
+from array import array
+
+import board
+
+
+class TranspositionTable:
+    '''Fixed size cache of minimax values keyed by the Zobrist key of a game
+
+    Entries live in preallocated arrays, so the memory used by the table never
+    grows after it is created. Slots are grouped in buckets of two:
+
+    * The first slot keeps the entry with the deepest search, since it saved
+      the most work
+    * The second slot is always replaced, so recent positions still get cached
+      when the first slot holds a deeper search
+
+    Symmetric tables key positions by ::func::board.canonical_hash() instead,
+    so boards that only differ by column order or color names share an entry
+
+    Attributes:
+       size(int): Amount of entries the table can hold
+       symmetric(bool): True if positions are keyed by their canonical board
+       hits(int): Probes that found a usable value
+       misses(int): Probes that did not find a usable value
+       stores(int): Values written to the table
+       evictions(int): Stores that overwrote another position
+    '''
+    __slots__ = ['size', 'symmetric', 'keys', 'depths', 'values', 'hits', 'misses', 'stores', 'evictions']
+
+    # Bytes used by a single entry (key, depth and value arrays)
+    entry_bytes = 8 + 1 + 8
+
+    def __init__(self, max_bytes: int = 16 * 2**20, symmetric: bool = False):
+        '''Allocates the table
+
+        Args:
+           max_bytes(int): Memory budget of the table, in bytes
+           symmetric(bool): Key positions by their canonical board. That merges
+            more positions, but computing the key is much slower than reading
+            the Zobrist key, so it only pays off when the searches below every
+            node are expensive
+
+        Raises:
+           ValueError: If the budget cannot hold a single bucket
+        '''
+        size = max_bytes // self.entry_bytes // 2 * 2
+
+        if size < 2:
+            raise ValueError(f"Expected max_bytes {max_bytes} to hold at least 2 entries")
+
+        self.size = size
+        self.symmetric = symmetric
+        self.keys = array('Q', [0]) * size
+        # Depth -1 marks an empty slot
+        self.depths = array('b', [-1]) * size
+        self.values = array('d', [0.0]) * size
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def position_key(self, position) -> int:
+        '''Key under which a position is stored in this table
+
+        Args:
+           position(Game.Game): Position to look up
+
+        Returns:
+           int: Zobrist key, or canonical hash for symmetric tables
+        '''
+        if self.symmetric:
+            return board.canonical_hash(position)
+
+        return position.key
+
+    def probe(self, key: int, depth: int):
+        '''Looks up the value of a position searched to a specific depth
+
+        The minimax value is not monotonic in depth, so only entries searched to
+        the exact same depth are returned
+
+        Args:
+           key(int): Key of the position, see position_key
+           depth(int): Remaining search depth
+
+        Returns:
+           float or None: Stored value, or None if it is not in the table
+        '''
+        slot = key % self.size & ~1
+
+        for index in (slot, slot + 1):
+            if self.keys[index] == key and self.depths[index] == depth:
+                self.hits += 1
+                return self.values[index]
+
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: float):
+        '''Saves the value of a position searched to a specific depth
+
+        Args:
+           key(int): Key of the position, see position_key
+           depth(int): Remaining search depth
+           value(float): Value found by the search
+        '''
+        slot = key % self.size & ~1
+        keys, depths = self.keys, self.depths
+
+        if keys[slot] == key and depths[slot] == depth:
+            index = slot
+
+        elif keys[slot + 1] == key and depths[slot + 1] == depth:
+            index = slot + 1
+
+        elif depth >= depths[slot]:
+            # Deeper searches take the first slot, the previous one moves down
+            if depths[slot + 1] >= 0 and depths[slot] >= 0:
+                self.evictions += 1
+
+            keys[slot + 1] = keys[slot]
+            depths[slot + 1] = depths[slot]
+            self.values[slot + 1] = self.values[slot]
+            index = slot
+
+        else:
+            if depths[slot + 1] >= 0:
+                self.evictions += 1
+            index = slot + 1
+
+        keys[index] = key
+        depths[index] = depth
+        self.values[index] = value
+        self.stores += 1
+
+    def clear(self):
+        '''Removes every entry, keeping the allocated memory'''
+        self.depths = array('b', [-1]) * self.size
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return self.size - self.depths.count(-1)
+
+    def __contains__(self, key: int) -> bool:
+        slot = key % self.size & ~1
+        return any(self.keys[index] == key and self.depths[index] >= 0 for index in (slot, slot + 1))